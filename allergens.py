@@ -0,0 +1,62 @@
+from __future__ import annotations
+import threading
+from functools import lru_cache
+
+# The 14 UK-regulated allergens get fixed bits; any other name gets the next free bit.
+ALLERGENS = (
+    "celery", "gluten", "crustaceans", "eggs", "fish", "lupin", "milk",
+    "molluscs", "mustard", "nuts", "peanuts", "sesame", "soya", "sulphites",
+)
+_SYNONYMS = {
+    "wheat": "gluten", "cereals containing gluten": "gluten",
+    "egg": "eggs", "dairy": "milk", "lactose": "milk",
+    "tree nuts": "nuts", "nut": "nuts", "peanut": "peanuts",
+    "soy": "soya", "sulphur dioxide": "sulphites", "sulfites": "sulphites",
+    "crustacean": "crustaceans", "mollusc": "molluscs",
+}
+
+_bits = {name: i for i, name in enumerate(ALLERGENS)}
+_bits_lock = threading.Lock()
+
+
+def _bit(name: str) -> int:
+    key = " ".join(str(name).lower().split())
+    key = _SYNONYMS.get(key, key)
+    if not key:
+        return 0
+    i = _bits.get(key)
+    if i is None:
+        with _bits_lock:
+            i = _bits.setdefault(key, len(_bits))
+    return 1 << i
+
+
+@lru_cache(maxsize=4096)
+def _mask(names: tuple) -> int:
+    m = 0
+    for n in names:
+        m |= _bit(n)
+    return m
+
+
+def allergen_mask(names) -> int:
+    """Bitmask for a list of allergen names (a product's allergens or a customer's allergies)."""
+    if not names:
+        return 0
+    if isinstance(names, str):
+        names = names.split(",")
+    return _mask(tuple(names))
+
+
+class AllergenIndex:
+    """Catalog rows with their allergens compiled to masks once, when the snapshot loads."""
+
+    def __init__(self, products):
+        self.products = list(products)
+        self.masks = [allergen_mask(p.get("allergens")) for p in self.products]
+
+    def safe(self, avoid: int) -> list:
+        """Products containing none of the allergens in the avoid mask."""
+        if not avoid:
+            return self.products
+        return [p for p, m in zip(self.products, self.masks) if not m & avoid]
@@ -1,15 +1,57 @@
+import importlib
+import logging
+import sys
+import threading
+import time
 import streamlit as st
 
 from state import init_state
 from settings import maintenance_enabled, contact_email
 from auth_ui import auth_sidebar
+from telemetry import begin_rerun
 
-from home import page_home
-from checkout import page_checkout
-from track_order import page_track_order
-from loyalty import page_loyalty
-from profile import page_profile
-from debug_auth import page_debug_auth
+log = logging.getLogger(__name__)
+
+# Menu label -> (module, page function, takes logged_in). Modules are imported on first visit.
+PAGES = {
+    "Shop": ("home", "page_home", False),
+    "Checkout": ("checkout", "page_checkout", True),
+    "Track order": ("track_order", "page_track_order", False),
+    "Loyalty": ("loyalty", "page_loyalty", False),
+    "Profile": ("profile", "page_profile", False),
+    "Debug Auth": ("debug_auth", "page_debug_auth", False),
+}
+
+_page_lock = threading.Lock()
+_page_imports = {}  # module -> {"seconds", "modules_added"} for pages this process imported
+
+
+def _load_page(label: str):
+    module_name, func_name, _ = PAGES[label]
+    if module_name in sys.modules:
+        # Always through import_module: it waits on the module's import lock, so a page
+        # another session is still importing (already in sys.modules, half executed)
+        # isn't used before it's done. Once loaded this is a dict lookup.
+        return getattr(importlib.import_module(module_name), func_name)
+    with _page_lock:
+        before = len(sys.modules)
+        t0 = time.perf_counter()
+        mod = importlib.import_module(module_name)
+        if module_name not in _page_imports:
+            _page_imports[module_name] = {
+                "seconds": round(time.perf_counter() - t0, 4),
+                "modules_added": len(sys.modules) - before,
+            }
+            log.info("loaded page %s (%s) in %.3fs", label, module_name, _page_imports[module_name]["seconds"])
+    return getattr(mod, func_name)
+
+
+def page_import_report() -> list[dict]:
+    """Which page modules this process has loaded, and what each first import cost."""
+    return [
+        {"page": label, "module": m, "loaded": m in sys.modules, **_page_imports.get(m, {"seconds": None, "modules_added": None})}
+        for label, (m, _, _) in PAGES.items()
+    ]
 
 
 def _maintenance_overlay():
@@ -60,6 +102,7 @@ def _maintenance_overlay():
 
 
 def run_app():
+    begin_rerun()
     init_state()
 
     # Sidebar auth (login/signup/logout)
@@ -75,19 +118,12 @@ def run_app():
 
     page = st.sidebar.radio(
         "Menu",
-        ["Shop", "Checkout", "Track order", "Loyalty", "Profile", "Debug Auth"],
+        list(PAGES),
         index=0,
     )
 
-    if page == "Shop":
-        page_home()
-    elif page == "Checkout":
-        page_checkout(logged_in=logged_in)
-    elif page == "Track order":
-        page_track_order()
-    elif page == "Loyalty":
-        page_loyalty()
-    elif page == "Profile":
-        page_profile()
+    render = _load_page(page)
+    if PAGES[page][2]:
+        render(logged_in=logged_in)
     else:
-        page_debug_auth()
+        render()
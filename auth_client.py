@@ -1,9 +1,59 @@
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from telemetry import record_call
+
+RETRY_STATUSES = {502, 503, 504}
+
+
+def _not_sent(e: requests.exceptions.ConnectionError) -> bool:
+    """True when the request never reached the server (connect timeout, refused, DNS failure)."""
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(e.args[0], "reason", None) if e.args else None
+    return isinstance(reason, NewConnectionError)
+
 
 class SupabaseAuth:
-    def __init__(self, url: str, anon_key: str):
+    # One keep-alive session per pool size, shared by every instance in the process.
+    _sessions = {}
+    _sessions_lock = threading.Lock()
+
+    def __init__(
+        self,
+        url: str,
+        anon_key: str,
+        pool_size: int = 10,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 15,
+        max_retries: int = 2,
+        backoff_base: float = 0.25,
+    ):
         self.url = url.rstrip("/")
         self.anon_key = anon_key
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.session = self._shared_session(pool_size)
+        self.latencies = defaultdict(lambda: deque(maxlen=500))  # call name -> recent ms
+
+    @classmethod
+    def _shared_session(cls, pool_size: int) -> requests.Session:
+        with cls._sessions_lock:
+            s = cls._sessions.get(pool_size)
+            if s is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                cls._sessions[pool_size] = s
+            return s
 
     def _headers(self, token: str | None = None):
         h = {"apikey": self.anon_key, "Content-Type": "application/json"}
@@ -11,33 +61,82 @@ class SupabaseAuth:
             h["Authorization"] = f"Bearer {token}"
         return h
 
+    def _post(self, name: str, path: str, idempotent: bool, token: str | None = None, json=None):
+        """POST with jittered retries: connect failures always; other failures and 5xx only when idempotent.
+
+        Calls that mint tokens or sessions (sign-in, sign-up) are not idempotent: a retry after
+        a read timeout could create a second session the first attempt already made.
+        """
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            try:
+                resp = self.session.post(
+                    f"{self.url}{path}",
+                    headers=self._headers(token),
+                    json=json,
+                    timeout=self.timeout,
+                )
+                retry = idempotent and resp.status_code in RETRY_STATUSES
+                error = None
+            except requests.exceptions.ConnectionError as e:
+                # A request that never reached the server is always safe to retry.
+                retry = idempotent or _not_sent(e)
+                resp, error = None, e
+            except requests.exceptions.Timeout as e:
+                retry = idempotent
+                resp, error = None, e
+            finally:
+                self.latencies[name].append((time.perf_counter() - t0) * 1000)
+            record_call(
+                "auth",
+                name,
+                t0,
+                size=len(resp.content) if resp is not None else None,
+                status=resp.status_code if resp is not None else None,
+                error=error or (resp.status_code if resp.status_code >= 400 else None),
+            )
+
+            if not retry or attempt >= self.max_retries:
+                if error is not None:
+                    raise error
+                return resp
+            attempt += 1
+            # Full jitter, so a burst of failed logins doesn't retry in lockstep.
+            time.sleep(random.uniform(0, self.backoff_base * (2 ** attempt)))
+
     def sign_up(self, email: str, password: str):
-        return requests.post(
-            f"{self.url}/auth/v1/signup",
-            headers=self._headers(),
-            json={"email": email, "password": password},
-            timeout=30,
-        )
+        return self._post("sign_up", "/auth/v1/signup", idempotent=False, json={"email": email, "password": password})
 
     def sign_in(self, email: str, password: str):
-        return requests.post(
-            f"{self.url}/auth/v1/token?grant_type=password",
-            headers=self._headers(),
+        return self._post(
+            "sign_in",
+            "/auth/v1/token?grant_type=password",
+            idempotent=False,
             json={"email": email, "password": password},
-            timeout=30,
         )
 
     def sign_out(self, access_token: str):
-        return requests.post(
-            f"{self.url}/auth/v1/logout",
-            headers=self._headers(access_token),
-            timeout=30,
-        )
+        return self._post("sign_out", "/auth/v1/logout", idempotent=True, token=access_token)
 
     def send_reset(self, email: str, redirect_to: str):
-        return requests.post(
-            f"{self.url}/auth/v1/recover",
-            headers=self._headers(),
+        return self._post(
+            "send_reset",
+            "/auth/v1/recover",
+            idempotent=False,
             json={"email": email, "redirect_to": redirect_to},
-            timeout=30,
         )
+
+    def latency_stats(self) -> dict:
+        """{call: {"count", "p50_ms", "p95_ms"}} over recent calls."""
+        out = {}
+        for name, values in self.latencies.items():
+            v = sorted(values)
+            if not v:
+                continue
+            out[name] = {
+                "count": len(v),
+                "p50_ms": round(v[len(v) // 2], 1),
+                "p95_ms": round(v[min(len(v) - 1, int(len(v) * 0.95))], 1),
+            }
+        return out
@@ -0,0 +1,162 @@
+from __future__ import annotations
+import json
+import threading
+import time
+import jwt
+import streamlit as st
+from config import get_option
+
+CACHE_MAX = 5000
+LEEWAY_SECONDS = 10
+
+
+class TokenUser:
+    """User identity taken from access-token claims (same attributes pages read off gotrue's User)."""
+
+    def __init__(self, claims: dict):
+        self.id = claims.get("sub")
+        self.email = claims.get("email")
+        self.phone = claims.get("phone")
+        self.role = claims.get("role")
+        self.app_metadata = claims.get("app_metadata") or {}
+        self.user_metadata = claims.get("user_metadata") or {}
+        self.exp = int(claims.get("exp") or 0)
+
+    @classmethod
+    def from_server_user(cls, user, exp: int) -> "TokenUser":
+        return cls({
+            "sub": getattr(user, "id", None),
+            "email": getattr(user, "email", None),
+            "phone": getattr(user, "phone", None),
+            "role": getattr(user, "role", None),
+            "app_metadata": getattr(user, "app_metadata", None),
+            "user_metadata": getattr(user, "user_metadata", None),
+            "exp": exp,
+        })
+
+
+class _Verifier:
+    def __init__(self, secret: str, jwks_file: str):
+        self.secret = secret or None
+        self.keys = {}
+        if jwks_file:
+            with open(jwks_file, "r", encoding="utf-8") as f:
+                jwks = json.load(f)
+            for k in jwks.get("keys", []):
+                try:
+                    self.keys[k.get("kid")] = jwt.PyJWK(k)
+                except Exception:
+                    # e.g. RS256/ES256 key without the crypto extra installed
+                    continue
+        self._cache: dict[str, TokenUser] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.secret or self.keys)
+
+    def _key_for(self, token: str):
+        # The algorithm comes from the key, never from the token header: a header naming
+        # a JWKS kid with alg HS384 must not send an RSA/EC key down the HMAC path.
+        header = jwt.get_unverified_header(token)
+        jwk = self.keys.get(header.get("kid"))
+        if jwk is not None:
+            return jwk.key, jwk.algorithm_name
+        if header.get("alg") == "HS256" and self.secret:
+            return self.secret, "HS256"
+        return None, header.get("alg")
+
+    def decode(self, token: str) -> dict | None:
+        """Verified claims, None if the token is invalid. Raises LookupError if no local key fits."""
+        try:
+            key, alg = self._key_for(token)
+        except jwt.PyJWTError:
+            return None
+        if key is None:
+            raise LookupError(f"No local key for {alg} token")
+        try:
+            return jwt.decode(token, key, algorithms=[alg], audience="authenticated", leeway=LEEWAY_SECONDS)
+        except Exception:
+            # Not only PyJWTError: a key/algorithm mismatch can raise TypeError and friends.
+            return None
+
+    def cached(self, token: str) -> TokenUser | None:
+        with self._lock:
+            u = self._cache.get(token)
+        if u and u.exp > time.time():
+            return u
+        return None
+
+    def remember(self, token: str, user: TokenUser) -> None:
+        with self._lock:
+            if len(self._cache) >= CACHE_MAX:
+                now = time.time()
+                self._cache = {t: u for t, u in self._cache.items() if u.exp > now}
+            self._cache[token] = user
+
+    def forget(self, token: str) -> None:
+        with self._lock:
+            self._cache.pop(token, None)
+
+
+@st.cache_resource(show_spinner=False)
+def _verifier(secret: str, jwks_file: str) -> _Verifier:
+    return _Verifier(secret, jwks_file)
+
+
+def _get_verifier() -> _Verifier:
+    return _verifier(get_option("SUPABASE_JWT_SECRET", ""), get_option("SUPABASE_JWKS_FILE", ""))
+
+
+def local_verifier_configured() -> bool:
+    return _get_verifier().configured
+
+
+def _current_token(sb) -> str | None:
+    token = getattr(sb, "access_token", None)
+    if not token:
+        token = (st.session_state.get("sb_tokens") or {}).get("access_token")
+    return token
+
+
+def get_current_user(sb):
+    """Logged-in user for this session, verified locally where possible.
+
+    Falls back to sb.auth.get_user() when no JWT secret / JWKS key matches the
+    token; either way the identity is cached until the token expires.
+    """
+    token = _current_token(sb)
+    if not token:
+        return None
+
+    v = _get_verifier()
+    user = v.cached(token)
+    if user:
+        return user
+
+    try:
+        claims = v.decode(token)
+        if claims is None:
+            return None
+        user = TokenUser(claims)
+    except LookupError:
+        try:
+            server_user = sb.auth.get_user(token).user
+        except Exception:
+            return None
+        if not server_user:
+            return None
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp") or 0
+        user = TokenUser.from_server_user(server_user, int(exp))
+    except jwt.PyJWTError:
+        return None
+
+    v.remember(token, user)
+    return user
+
+
+def forget_current_user(sb) -> None:
+    # Call on logout / revocation so the cached identity isn't served again.
+    token = _current_token(sb)
+    if token:
+        _get_verifier().forget(token)
@@ -1,5 +1,6 @@
 import streamlit as st
 from supabase_client import get_client
+from auth_tokens import get_current_user, forget_current_user
 
 
 def auth_sidebar():
@@ -7,18 +8,16 @@ def auth_sidebar():
 
     st.sidebar.subheader("Account")
 
-    user = None
-    try:
-        user = sb.auth.get_user().user
-    except Exception:
-        user = None
+    user = get_current_user(sb)
 
     if user:
         email = getattr(user, "email", None) or "Logged in"
         st.sidebar.success(email)
         if st.sidebar.button("Log out"):
+            forget_current_user(sb)
             try:
-                sb.auth.sign_out()
+                if sb.access_token:
+                    sb.auth.admin.sign_out(sb.access_token)
             except Exception:
                 pass
             st.session_state.sb_tokens = None
@@ -0,0 +1,168 @@
+"""Load test for guest_create_order against a throwaway local Postgres.
+
+Creates a scratch database next to the one in --dsn, adds minimal orders /
+order_items tables, loads sql_recreate_guest_create_order.sql, fires guest
+orders of varying sizes from concurrent connections, reports orders/s and
+latency percentiles, then drops the scratch database.
+
+Needs a local Postgres you can CREATE DATABASE on and psycopg (or psycopg2):
+
+    pip install "psycopg[binary]"
+    python bench_guest_create_order.py --dsn postgresql://postgres@localhost/postgres \\
+        --workers 8 --orders 2000 --sizes 1 3 10 30
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import threading
+import time
+
+try:
+    import psycopg as _pg
+except ImportError:
+    try:
+        import psycopg2 as _pg
+    except ImportError:
+        _pg = None
+
+SQL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql_recreate_guest_create_order.sql")
+
+SCHEMA = """
+do $$ begin
+  if not exists (select 1 from pg_roles where rolname = 'anon') then
+    create role anon nologin;
+  end if;
+end $$;
+
+create sequence if not exists public.order_code_seq;
+
+create table public.orders (
+  id bigserial primary key,
+  order_code text not null default
+    'WB-' || to_char(now(), 'YYYYMMDD') || '-' || lpad(nextval('public.order_code_seq')::text, 6, '0'),
+  order_type text,
+  payment_method text,
+  status text,
+  total_inc_vat numeric,
+  order_notes text,
+  created_at timestamptz default now()
+);
+
+create table public.order_items (
+  id bigserial primary key,
+  order_id bigint not null references public.orders(id),
+  product_id bigint,
+  product_name_snapshot text,
+  qty int,
+  unit_price_ex_vat numeric,
+  vat_rate numeric,
+  line_total_ex_vat numeric,
+  line_vat numeric,
+  line_total_inc_vat numeric,
+  unit_price_inc_vat numeric
+);
+"""
+
+
+def _connect(dsn, **kw):
+    conn = _pg.connect(dsn, **kw)
+    conn.autocommit = True
+    return conn
+
+
+def _items(n):
+    items = []
+    for i in range(n):
+        qty = random.randint(1, 4)
+        unit_ex = round(random.uniform(1.0, 25.0), 2)
+        unit_inc = round(unit_ex * 1.2, 2)
+        items.append({
+            "product_id": random.randint(1, 200),
+            "product_name": f"Item {i}",
+            "qty": qty,
+            "unit_price_ex_vat": unit_ex,
+            "vat_rate": 20.0,
+            "line_total_ex_vat": round(unit_ex * qty, 2),
+            "line_vat": round((unit_inc - unit_ex) * qty, 2),
+            "line_total_inc_vat": round(unit_inc * qty, 2),
+            "unit_price_inc_vat": unit_inc,
+        })
+    return items
+
+
+def _worker(dsn, dbname, n_orders, sizes, latencies, lock):
+    conn = _connect(dsn, dbname=dbname)
+    cur = conn.cursor()
+    mine = []
+    for _ in range(n_orders):
+        items = _items(random.choice(sizes))
+        total = round(sum(i["line_total_inc_vat"] for i in items), 2)
+        t0 = time.perf_counter()
+        cur.execute(
+            "select * from public.guest_create_order(%s, %s, %s, %s, %s::jsonb)",
+            ("pickup", "cash", total, None, json.dumps(items)),
+        )
+        cur.fetchall()
+        mine.append((len(items), time.perf_counter() - t0))
+    conn.close()
+    with lock:
+        latencies.extend(mine)
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dsn", default=os.getenv("BENCH_PG_DSN", "postgresql://postgres@localhost/postgres"))
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--orders", type=int, default=1000, help="total orders across all workers")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1, 3, 10, 30], help="items per order to pick from")
+    args = ap.parse_args()
+
+    if _pg is None:
+        raise SystemExit("Install psycopg (or psycopg2) to run this benchmark.")
+
+    dbname = f"bakery_bench_{os.getpid()}"
+    admin = _connect(args.dsn)
+    admin.cursor().execute(f'create database "{dbname}"')
+    try:
+        setup = _connect(args.dsn, dbname=dbname)
+        cur = setup.cursor()
+        cur.execute(SCHEMA)
+        with open(SQL_FILE, "r", encoding="utf-8") as f:
+            cur.execute(f.read())
+        setup.close()
+
+        latencies, lock = [], threading.Lock()
+        per_worker = max(1, args.orders // args.workers)
+        threads = [
+            threading.Thread(target=_worker, args=(args.dsn, dbname, per_worker, args.sizes, latencies, lock))
+            for _ in range(args.workers)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - t0
+
+        all_ms = [s * 1000 for _n, s in latencies]
+        print(f"orders: {len(latencies)}  workers: {args.workers}  wall: {wall:.2f}s")
+        print(f"throughput: {len(latencies) / wall:.1f} orders/s")
+        print(f"latency ms: p50 {_pct(all_ms, 50):.2f}  p95 {_pct(all_ms, 95):.2f}  p99 {_pct(all_ms, 99):.2f}")
+        print(f"{'items':>5}  {'orders':>6}  {'mean ms':>8}  {'p95 ms':>7}")
+        for size in sorted(set(n for n, _s in latencies)):
+            ms = [s * 1000 for n, s in latencies if n == size]
+            print(f"{size:>5}  {len(ms):>6}  {statistics.mean(ms):>8.2f}  {_pct(ms, 95):>7.2f}")
+    finally:
+        admin.cursor().execute(f'drop database if exists "{dbname}" with (force)')
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Logged-in order creation against a throwaway local Postgres: per-row writes vs. one RPC.
+
+Creates a scratch database next to the one in --dsn, adds minimal orders /
+order_items tables and an auth.uid() stand-in, loads sql_create_customer_order.sql,
+then for each cart size times both ways of writing an order:
+
+- per-row: insert the order, then one insert per item, each its own statement
+  and transaction (what the app did through PostgREST before the RPC);
+- rpc: one call to customer_create_order(p_order, p_items).
+
+Reports statements per order and latency percentiles, then drops the scratch
+database. Timings are a local connection's; over the network every statement
+also pays a round trip, so the per-row path grows with the line count.
+
+Needs a local Postgres you can CREATE DATABASE on and psycopg (or psycopg2):
+
+    pip install "psycopg[binary]"
+    python bench_order_writes.py --dsn postgresql://postgres@localhost/postgres \\
+        --lines 1 5 10 25 50 --repeat 200
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+try:
+    import psycopg as _pg
+except ImportError:
+    try:
+        import psycopg2 as _pg
+    except ImportError:
+        _pg = None
+
+SQL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql_create_customer_order.sql")
+
+SCHEMA = """
+do $$ begin
+  if not exists (select 1 from pg_roles where rolname = 'authenticated') then
+    create role authenticated nologin;
+  end if;
+end $$;
+
+create schema if not exists auth;
+create or replace function auth.uid() returns uuid language sql stable as $$
+  select '00000000-0000-0000-0000-000000000001'::uuid
+$$;
+
+create sequence if not exists public.order_code_seq;
+
+create table public.orders (
+  id bigserial primary key,
+  order_code text not null default
+    'WB-' || to_char(now(), 'YYYYMMDD') || '-' || lpad(nextval('public.order_code_seq')::text, 6, '0'),
+  order_type text,
+  payment_method text,
+  status text,
+  total_inc_vat numeric,
+  order_notes text,
+  customer_id bigint,
+  customer_auth_user_id uuid,
+  customer_email_snapshot text,
+  customer_phone_snapshot text,
+  created_at timestamptz default now()
+);
+
+create table public.order_items (
+  id bigserial primary key,
+  order_id bigint not null references public.orders(id),
+  product_id bigint,
+  product_name_snapshot text,
+  qty int,
+  unit_price_ex_vat numeric,
+  vat_rate numeric,
+  line_total_ex_vat numeric,
+  line_vat numeric,
+  line_total_inc_vat numeric,
+  unit_price_inc_vat numeric
+);
+"""
+
+ITEM_COLUMNS = (
+    "product_id", "product_name_snapshot", "qty", "unit_price_ex_vat", "vat_rate",
+    "line_total_ex_vat", "line_vat", "line_total_inc_vat", "unit_price_inc_vat",
+)
+
+
+def _connect(dsn, **kw):
+    conn = _pg.connect(dsn, **kw)
+    conn.autocommit = True
+    return conn
+
+
+def _line_items(n):
+    items = []
+    for i in range(n):
+        qty = random.randint(1, 4)
+        unit_ex = round(random.uniform(1.0, 25.0), 2)
+        unit_inc = round(unit_ex * 1.2, 2)
+        items.append({
+            "product_id": random.randint(1, 200),
+            "product_name_snapshot": f"Item {i}",
+            "qty": qty,
+            "unit_price_ex_vat": unit_ex,
+            "vat_rate": 20.0,
+            "line_total_ex_vat": round(unit_ex * qty, 2),
+            "line_vat": round((unit_inc - unit_ex) * qty, 2),
+            "line_total_inc_vat": round(unit_inc * qty, 2),
+            "unit_price_inc_vat": unit_inc,
+        })
+    return items
+
+
+def _order(items):
+    return {
+        "order_type": "pickup",
+        "payment_method": "cash",
+        "total_inc_vat": round(sum(i["line_total_inc_vat"] for i in items), 2),
+        "order_notes": None,
+        "customer_id": 1,
+        "customer_email_snapshot": "bench@example.com",
+        "customer_phone_snapshot": "07700900000",
+    }
+
+
+def _per_row_create(cur, order, items) -> int:
+    cur.execute(
+        "insert into public.orders (order_type, payment_method, status, total_inc_vat, order_notes, customer_id,"
+        " customer_auth_user_id, customer_email_snapshot, customer_phone_snapshot)"
+        " values (%s, %s, 'pending', %s, %s, %s, auth.uid(), %s, %s) returning id, order_code",
+        (order["order_type"], order["payment_method"], order["total_inc_vat"], order["order_notes"],
+         order["customer_id"], order["customer_email_snapshot"], order["customer_phone_snapshot"]),
+    )
+    order_id = cur.fetchone()[0]
+    for li in items:
+        cur.execute(
+            f"insert into public.order_items (order_id, {', '.join(ITEM_COLUMNS)})"
+            f" values (%s, {', '.join(['%s'] * len(ITEM_COLUMNS))})",
+            (order_id, *(li[c] for c in ITEM_COLUMNS)),
+        )
+    return 1 + len(items)
+
+
+def _rpc_create(cur, order, items) -> int:
+    cur.execute("select * from public.customer_create_order(%s::jsonb, %s::jsonb)", (json.dumps(order), json.dumps(items)))
+    cur.fetchall()
+    return 1
+
+
+def _measure(cur, fn, n, repeat):
+    ms, statements = [], 0
+    for _ in range(repeat):
+        items = _line_items(n)
+        t0 = time.perf_counter()
+        statements = fn(cur, _order(items), items)
+        ms.append((time.perf_counter() - t0) * 1000)
+    return statements, ms
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dsn", default=os.getenv("BENCH_PG_DSN", "postgresql://postgres@localhost/postgres"))
+    ap.add_argument("--lines", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    ap.add_argument("--repeat", type=int, default=200, help="orders per path and cart size")
+    args = ap.parse_args()
+
+    if _pg is None:
+        raise SystemExit("Install psycopg (or psycopg2) to run this benchmark.")
+
+    dbname = f"bakery_bench_{os.getpid()}"
+    admin = _connect(args.dsn)
+    admin.cursor().execute(f'create database "{dbname}"')
+    try:
+        conn = _connect(args.dsn, dbname=dbname)
+        cur = conn.cursor()
+        cur.execute(SCHEMA)
+        with open(SQL_FILE, "r", encoding="utf-8") as f:
+            cur.execute(f.read())
+
+        print(f"{'lines':>5}  {'per-row stmts':>13}  {'p50 ms':>7}  {'p95 ms':>7}  {'rpc stmts':>9}  {'p50 ms':>7}  {'p95 ms':>7}")
+        for n in args.lines:
+            row_stmts, row_ms = _measure(cur, _per_row_create, n, args.repeat)
+            rpc_stmts, rpc_ms = _measure(cur, _rpc_create, n, args.repeat)
+            print(
+                f"{n:>5}  {row_stmts:>13}  {_pct(row_ms, 50):>7.2f}  {_pct(row_ms, 95):>7.2f}"
+                f"  {rpc_stmts:>9}  {_pct(rpc_ms, 50):>7.2f}  {_pct(rpc_ms, 95):>7.2f}"
+            )
+        cur.execute("select count(*) from public.order_items")
+        print(f"order_items written: {cur.fetchone()[0]}")
+        conn.close()
+    finally:
+        admin.cursor().execute(f'drop database if exists "{dbname}" with (force)')
+        admin.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,140 @@
 import streamlit as st
-from catalog import display_price_ex_vat
+from catalog import catalog_version, get_price_table
+from pricing import unit_price, from_pence
+
+
+class CartLine:
+    __slots__ = ("qty", "name", "unit_ex", "unit_inc")
+
+    def __init__(self, qty: int):
+        self.qty = qty
+        self.name = ""
+        self.unit_ex = None  # pence; None until priced
+        self.unit_inc = None
+
+
+class Cart:
+    """Session cart keyed by int product ID, with running totals (pence) of its priced lines.
+
+    add/set adjust the totals and item count in O(1), pricing a line as it goes in when
+    given its UnitPrice; price() only re-prices every line when the catalog version has
+    changed, otherwise just the lines not priced yet.
+    """
+
+    __slots__ = ("lines", "ex", "inc", "count", "version")
+
+    def __init__(self, quantities=None):
+        self.lines = {}  # product_id -> CartLine
+        self.ex = 0
+        self.inc = 0
+        self.count = 0  # total quantity
+        self.version = None
+        for pid, qty in (quantities or {}).items():
+            self.set(pid, qty)
+
+    @staticmethod
+    def key(product_id):
+        try:
+            return int(product_id)
+        except (TypeError, ValueError):
+            return None
+
+    def set(self, product_id, qty, price=None) -> None:
+        """price: the product's UnitPrice, used if the line isn't priced yet."""
+        pid = self.key(product_id)
+        if pid is None:
+            return
+        qty = max(int(qty), 0)
+        line = self.lines.get(pid)
+        if line is None:
+            if not qty:
+                return
+            line = self.lines[pid] = CartLine(0)
+        if line.unit_ex is None and price is not None:
+            line.unit_ex, line.unit_inc = price.ex, price.inc
+            self.ex += price.ex * line.qty
+            self.inc += price.inc * line.qty
+        if line.unit_ex is not None:
+            self.ex += line.unit_ex * (qty - line.qty)
+            self.inc += line.unit_inc * (qty - line.qty)
+        self.count += qty - line.qty
+        if qty:
+            line.qty = qty
+        else:
+            del self.lines[pid]
+
+    def add(self, product_id, qty: int = 1, price=None) -> None:
+        self.set(product_id, self.get(product_id) + int(qty), price)
+
+    def get(self, product_id, default: int = 0) -> int:
+        line = self.lines.get(self.key(product_id))
+        return line.qty if line else default
+
+    def keys(self):
+        return self.lines.keys()
+
+    def items(self):
+        return ((pid, line.qty) for pid, line in self.lines.items())
+
+    def __contains__(self, product_id) -> bool:
+        return self.key(product_id) in self.lines
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def price(self, products_by_id: dict, version) -> None:
+        """Price lines from catalog rows; lines whose product is missing stay unpriced (left out)."""
+        full = version != self.version
+        if full:
+            self.ex = self.inc = 0
+        for pid, line in self.lines.items():
+            if line.unit_ex is not None and not full:
+                continue
+            p = products_by_id.get(pid)
+            if p is None:
+                line.unit_ex = line.unit_inc = None
+                continue
+            u = unit_price(p)
+            line.name, line.unit_ex, line.unit_inc = p.get("name", ""), u.ex, u.inc
+            self.ex += u.ex * line.qty
+            self.inc += u.inc * line.qty
+        self.version = version
+
+
+def session_cart() -> Cart:
+    cart = st.session_state.get("cart")
+    if not isinstance(cart, Cart):
+        # Older sessions (and the portal before) kept a plain {product_id: qty} dict.
+        cart = st.session_state.cart = Cart(cart or {})
+    return cart
 
 def cart_add(product_id: int, qty: int = 1):
-    cart = st.session_state.cart
-    cart[product_id] = int(cart.get(product_id, 0)) + int(qty)
-    if cart[product_id] <= 0:
-        cart.pop(product_id, None)
+    session_cart().add(product_id, qty, get_price_table().get(Cart.key(product_id)))
 
 def cart_set(product_id: int, qty: int):
-    cart = st.session_state.cart
-    if qty <= 0:
-        cart.pop(product_id, None)
-    else:
-        cart[product_id] = int(qty)
+    session_cart().set(product_id, qty, get_price_table().get(Cart.key(product_id)))
 
 def cart_clear():
-    st.session_state.cart = {}
+    st.session_state.cart = Cart()
+
+def _line_dicts(cart: Cart):
+    return [{
+        "product_id": pid,
+        "name": line.name,
+        "qty": line.qty,
+        "unit_price_ex_vat": from_pence(line.unit_ex),
+        "line_ex_vat": from_pence(line.unit_ex * line.qty),
+    } for pid, line in cart.lines.items() if line.unit_ex is not None]
 
 def cart_items(products_by_id: dict):
-    items = []
-    for pid, qty in st.session_state.cart.items():
-        p = products_by_id.get(pid)
-        if not p:
-            continue
-        unit_ex = display_price_ex_vat(p)
-        items.append({
-            "product_id": pid,
-            "name": p.get("name", ""),
-            "qty": int(qty),
-            "unit_price_ex_vat": unit_ex,
-            "line_ex_vat": unit_ex * int(qty),
-        })
-    return items
+    cart = session_cart()
+    cart.price(products_by_id, catalog_version())
+    return _line_dicts(cart)
 
 def cart_totals(products_by_id: dict):
-    items = cart_items(products_by_id)
-    subtotal = sum(i["line_ex_vat"] for i in items)
-    return items, round(subtotal, 2)
+    cart = session_cart()
+    cart.price(products_by_id, catalog_version())
+    return _line_dicts(cart), from_pence(cart.ex)
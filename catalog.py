@@ -1,33 +1,179 @@
+import logging
+import threading
+import time
 import streamlit as st
-from supabase_client import get_client
+from supabase_client import get_anon_client, get_client
+from search_index import CatalogIndex
+from pricing import unit_price, price_products, from_pence
+from settings import cached_public_settings
+from telemetry import call_view
+from warm_start import startup_snapshot, write_snapshot
 
+log = logging.getLogger(__name__)
+
+CATEGORY_COLUMNS = "id,name,description,is_active"
+
+# The process-wide catalog caches are filled through the anon client, never a visitor's session.
 @st.cache_data(ttl=60, show_spinner=False)
-def fetch_categories():
-    sb = get_client()
-    resp = sb.table("categories").select("id,name,description,is_active").eq("is_active", True).order("name").execute()
+def _fetch_categories():
+    sb = get_anon_client()
+    resp = sb.table("categories").select(CATEGORY_COLUMNS).eq("is_active", True).order("name").execute()
     return resp.data or []
 
+def fetch_categories():
+    warm = _warm_rows()
+    return warm["categories"] if warm is not None else _fetch_categories()
+
+# Each view asks only for the columns it uses.
+PRICING_COLUMNS = "pricing_mode,manual_price_ex_vat,recommended_price_ex_vat,base_price,apply_vat,custom_vat_rate"
+VIEW_COLUMNS = {
+    "card": f"id,category_id,name,description,{PRICING_COLUMNS}",  # Shop cards, search, price table
+    "cart": f"id,name,{PRICING_COLUMNS}",  # cart / checkout pricing
+}
+PRODUCT_CACHE_TTL = 60
+SNAPSHOT_SCHEMA = f"categories:{CATEGORY_COLUMNS};products:{VIEW_COLUMNS['card']}"
+SNAPSHOT_WRITE_SECONDS = 300
+
 @st.cache_data(ttl=60, show_spinner=False)
-def fetch_products(category_id=None, search=None):
-    sb = get_client()
-    q = sb.table("products").select(
-        "id,category_id,name,description,image_url,is_active,pricing_mode,manual_price_ex_vat,recommended_price_ex_vat,base_price,apply_vat,custom_vat_rate"
-    ).eq("is_active", True)
+def _fetch_products(category_id=None, search=None):
+    sb = get_anon_client()
+    q = sb.table("products").select(VIEW_COLUMNS["card"]).eq("is_active", True)
     if category_id:
         q = q.eq("category_id", category_id)
     if search:
         # Supabase "ilike" is supported via .ilike
         q = q.ilike("name", f"%{search}%")
-    resp = q.order("name").execute()
-    return resp.data or []
+    with call_view("card"):
+        resp = q.order("name").execute()
+    rows = resp.data or []
+    if not category_id and not search:
+        _save_snapshot(rows)
+    return rows
+
+def fetch_products(category_id=None, search=None):
+    warm = _warm_rows() if not category_id and not search else None
+    return warm["products"] if warm is not None else _fetch_products(category_id, search)
+
+class _WarmCatalog:
+    """The on-disk snapshot, served until this process has loaded the live catalog once."""
+
+    def __init__(self, snap):
+        self.snap = snap
+        self.live = snap is None
+        self.refreshing = False
+        self.saved_at = snap["written_at"] if snap else 0.0
+        self.lock = threading.Lock()
+
+@st.cache_resource(show_spinner=False)
+def _warm() -> _WarmCatalog:
+    snap = startup_snapshot()
+    return _WarmCatalog(snap if snap and snap["schema"] == SNAPSHOT_SCHEMA else None)
+
+def _go_live(warm: _WarmCatalog):
+    try:
+        _fetch_categories()
+        _fetch_products(None, None)  # same cache key as fetch_products()
+    except Exception:
+        log.warning("catalog refresh after warm start failed; still serving the snapshot", exc_info=True)
+        with warm.lock:
+            warm.refreshing = False
+        return
+    with warm.lock:
+        warm.live = True
+        warm.refreshing = False
+
+def _warm_rows():
+    """Snapshot rows while the live catalog isn't loaded yet (first call starts loading it in the background)."""
+    warm = _warm()
+    with warm.lock:
+        if warm.live:
+            return None
+        start = not warm.refreshing
+        warm.refreshing = True
+    if start:
+        # No script ctx on purpose: the live fetch belongs to the process, not this session.
+        threading.Thread(target=_go_live, args=(warm,), name="catalog-warm-start", daemon=True).start()
+    return warm.snap
+
+def _save_snapshot(products):
+    warm = _warm()
+    now = time.time()
+    with warm.lock:
+        if now - warm.saved_at < SNAPSHOT_WRITE_SECONDS:
+            return
+        warm.saved_at = now
+    write_snapshot(_fetch_categories(), products, cached_public_settings(), SNAPSHOT_SCHEMA)
+
+def get_catalog_index() -> CatalogIndex:
+    return _catalog_index(_warm_rows() is None)
+
+@st.cache_resource(ttl=60, show_spinner=False)
+def _catalog_index(live: bool) -> CatalogIndex:
+    # One index per catalog snapshot (warm-start and live kept apart); Shop searches are served from memory.
+    return CatalogIndex(fetch_products())
+
+class _ProductCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = {}  # (columns, active_only, product_id) -> (fetched_at, row or None)
+        self.version = 0  # bumped when a re-fetched row differs from the cached one
+
+@st.cache_resource(show_spinner=False)
+def _product_cache() -> _ProductCache:
+    return _ProductCache()
+
+def fetch_products_by_ids(ids, columns: str | None = None, active_only: bool = True, sb=None, view: str = "cart") -> dict:
+    """{product_id: row} for just these IDs; only IDs missing from the cache are queried (one in_ call).
+
+    columns defaults to the view's projection (VIEW_COLUMNS).
+    """
+    columns = columns or VIEW_COLUMNS[view]
+    ids = {int(i) for i in ids if i is not None and str(i).strip().lstrip("-").isdigit()}
+    cache = _product_cache()
+    now = time.monotonic()
+    found, missing = {}, []
+    with cache.lock:
+        for pid in ids:
+            hit = cache.rows.get((columns, active_only, pid))
+            if hit and now - hit[0] < PRODUCT_CACHE_TTL:
+                if hit[1] is not None:
+                    found[pid] = hit[1]
+            else:
+                missing.append(pid)
+
+    if missing:
+        sb = sb or get_client()
+        q = sb.table("products").select(columns).in_("id", sorted(missing))
+        if active_only:
+            q = q.eq("is_active", True)
+        with call_view(view):
+            resp = q.execute()
+        rows = getattr(resp, "data", resp) or []
+        fetched = {int(r["id"]): r for r in rows}
+        with cache.lock:
+            for pid in missing:
+                key = (columns, active_only, pid)
+                old = cache.rows.get(key)
+                if old is not None and old[1] != fetched.get(pid):
+                    cache.version += 1
+                # Unknown / inactive IDs are cached as None so they aren't re-queried every rerun.
+                cache.rows[key] = (now, fetched.get(pid))
+        found.update(fetched)
+    return found
+
+def catalog_version() -> int:
+    """Changes whenever a product row served by fetch_products_by_ids changes (price, name, removal)."""
+    cache = _product_cache()
+    with cache.lock:
+        return cache.version
+
+def get_price_table() -> dict:
+    return _price_table(_warm_rows() is None)
+
+@st.cache_resource(ttl=60, show_spinner=False)
+def _price_table(live: bool) -> dict:
+    # {product_id: UnitPrice} computed once per catalog snapshot
+    return price_products(fetch_products())
 
 def display_price_ex_vat(p: dict) -> float:
-    # Mirrors DB pricing choice used in guest_create_order
-    mode = (p.get("pricing_mode") or "auto")
-    if mode == "manual" and p.get("manual_price_ex_vat") is not None:
-        return float(p["manual_price_ex_vat"])
-    if p.get("recommended_price_ex_vat") is not None:
-        return float(p["recommended_price_ex_vat"])
-    if p.get("base_price") is not None:
-        return float(p["base_price"])
-    return 0.0
+    return from_pence(unit_price(p).ex)
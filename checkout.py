@@ -1,19 +1,18 @@
 import streamlit as st
-from catalog import fetch_products
-from cart import cart_totals, cart_set, cart_clear
+from catalog import fetch_products_by_ids
+from cart import cart_totals, cart_set, cart_clear, session_cart
 from supabase_client import get_client
+from query_runner import run_queries, value_or
+from auth_tokens import get_current_user
 
 
 def _products_by_id():
-    prods = fetch_products()
-    return {int(p["id"]): p for p in prods}
+    # Only price what is in the cart, not the whole catalog.
+    return fetch_products_by_ids(session_cart().keys())
 
 
 def _get_user(sb):
-    try:
-        return sb.auth.get_user().user
-    except Exception:
-        return None
+    return get_current_user(sb)
 
 
 def _get_profile(sb, uid):
@@ -35,10 +34,7 @@ def page_checkout(logged_in: bool = False):
     st.header("🧺 Checkout")
 
     sb = get_client()
-    products_by_id = _products_by_id()
-
-    items, _subtotal = cart_totals(products_by_id)
-    if not items:
+    if not session_cart():
         st.info("Your cart is empty. Go back to Shop to add items.")
         return
 
@@ -46,7 +42,22 @@ def page_checkout(logged_in: bool = False):
     user = _get_user(sb) if logged_in else None
     uid = getattr(user, "id", None) if user else None
     user_email = getattr(user, "email", None) if user else None
-    profile = _get_profile(sb, uid) if uid else None
+
+    # Cart prices and profile don't depend on each other: fetch both at once.
+    queries = {"products": _products_by_id}
+    if uid:
+        queries["profile"] = lambda: _get_profile(sb, uid)
+    res = run_queries(queries)
+    if not res["products"].ok:
+        st.error("Could not load product prices. Please try again.")
+        return
+    products_by_id = res["products"].value
+    profile = value_or(res["profile"]) if uid else None
+
+    items, _subtotal = cart_totals(products_by_id)
+    if not items:
+        st.info("Your cart is empty. Go back to Shop to add items.")
+        return
 
     st.subheader("Your cart")
     for it in items:
@@ -0,0 +1,30 @@
+import os
+import streamlit as st
+
+_TRUE = {"1", "true", "yes", "on"}
+_FALSE = {"0", "false", "no", "off"}
+
+
+def _coerce(key: str, value, default):
+    if isinstance(default, bool):
+        # bool("false") is True, so booleans are parsed rather than cast.
+        if isinstance(value, bool):
+            return value
+        v = str(value).strip().lower()
+        if v in _TRUE:
+            return True
+        if v in _FALSE:
+            return False
+        raise ValueError(f"Config {key}: expected true/false, got {value!r}")
+    return type(default)(value)
+
+
+def get_option(key: str, default):
+    """Optional setting from Streamlit secrets, then env vars, else default (converted to default's type)."""
+    try:
+        if key in st.secrets:
+            return _coerce(key, st.secrets[key], default)
+    except FileNotFoundError:
+        pass
+    v = os.getenv(key)
+    return _coerce(key, v, default) if v else default
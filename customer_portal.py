@@ -1,25 +1,28 @@
 import streamlit as st
 from ui_text import TERMS_AND_CONDITIONS, STATUS_HELP
+from catalog import fetch_products_by_ids
+from cart import Cart, session_cart
+from image_cache import thumbnail
+from tracking_cache import cached_track, TrackingRateLimited
+from pricing import VAT_DEFAULT_RATE, unit_price_from_inc, price_lines, totals, from_pence
+from allergens import AllergenIndex, allergen_mask
+from telemetry import call_view
 
-VAT_DEFAULT = 20.0  # fallback if product vat not present
+VAT_DEFAULT = VAT_DEFAULT_RATE  # fallback if product vat not present
+MENU_COLUMNS = "id,name,description,image_url,allergens,recommended_price_inc_vat"
 
 def _cart():
-    return st.session_state.setdefault("cart", {})  # {product_id: qty}
+    return session_cart()  # shared Cart: int product IDs, same as the shop
 
 def clear_cart():
-    st.session_state["cart"] = {}
+    st.session_state["cart"] = Cart()
 
-def _hide_allergenic_products(products, allergies):
-    if not allergies:
-        return products
-    allergies = set(a.lower() for a in allergies)
-    safe = []
-    for p in products:
-        prod_allergens = set(a.lower() for a in (p.get("allergens") or []))
-        if prod_allergens.intersection(allergies):
-            continue
-        safe.append(p)
-    return safe
+@st.cache_resource(ttl=60, show_spinner=False)
+def _menu_index(_supabase) -> AllergenIndex:
+    # One menu snapshot for every session; allergen masks are built here, not per rerun.
+    with call_view("menu"):
+        products = _supabase.table("products").select(MENU_COLUMNS).eq("is_active", True).order("name").execute()
+    return AllergenIndex(products or [])
 
 def render_terms_checkbox(key="terms_ok"):
     st.markdown(TERMS_AND_CONDITIONS)
@@ -28,13 +31,11 @@ def render_terms_checkbox(key="terms_ok"):
 def render_menu(supabase, customer_row=None):
     st.subheader("Menu")
     q = st.text_input("Search", placeholder="Search items...")
-    query = supabase.table("products").select("*").eq("is_active", True).order("name")
-    if q.strip():
-        query = query.ilike("name", f"*{q.strip()}*")
-    products = query.execute()
-
     allergies = customer_row.get("allergies") if customer_row else None
-    products = _hide_allergenic_products(products, allergies)
+    products = _menu_index(supabase).safe(allergen_mask(allergies))
+    needle = q.strip().lower()
+    if needle:
+        products = [p for p in products if needle in (p.get("name") or "").lower()]
 
     if not products:
         st.info("No items available.")
@@ -50,18 +51,17 @@ def render_menu(supabase, customer_row=None):
                 if p.get("description"):
                     st.caption(p["description"])
                 if p.get("image_url"):
-                    st.image(p["image_url"], use_container_width=True)
+                    # Small cached thumbnail in the list (the original until it is cached); full-size only when asked for.
+                    st.image(thumbnail(p["image_url"]), use_container_width=True)
+                    if st.toggle("Full-size photo", key=f"fullimg_{pid}"):
+                        st.image(p["image_url"], use_container_width=True)
                 if p.get("allergens"):
                     st.caption("Allergens: " + ", ".join(p["allergens"]))
             with cols[1]:
                 price_inc = float(p.get("recommended_price_inc_vat") or 0)
                 st.markdown(f"**£{price_inc:.2f}**")
                 qty = st.number_input("Qty", 0, 50, int(cart.get(pid, 0)), key=f"qty_{pid}")
-                if qty > 0:
-                    cart[pid] = int(qty)
-                else:
-                    cart.pop(pid, None)
-    st.session_state["cart"] = cart
+                cart.set(pid, qty)
 
 def render_cart_sidebar(supabase):
     with st.sidebar:
@@ -71,31 +71,24 @@ def render_cart_sidebar(supabase):
             st.caption("Your cart is empty.")
             return
 
-        products = supabase.table("products").select("id,name,recommended_price_inc_vat").execute()
-        prod_map = {str(p["id"]): p for p in products}
+        products = fetch_products_by_ids(cart.keys(), "id,name,recommended_price_inc_vat", active_only=False, sb=supabase)
+        units = {pid: unit_price_from_inc(p.get("recommended_price_inc_vat")) for pid, p in products.items()}
+        lines = price_lines(units, cart)
 
-        total = 0.0
-        for pid, qty in cart.items():
-            p = prod_map.get(pid)
-            if not p:
-                continue
-            unit_inc = float(p.get("recommended_price_inc_vat") or 0)
-            total += unit_inc * qty
-            st.write(f"{qty} × {p['name']} — £{unit_inc*qty:.2f}")
+        for li in lines:
+            st.write(f"{li.qty} × {products[li.product_id]['name']} — £{from_pence(li.line_inc):.2f}")
 
-        st.markdown(f"### Total: £{total:.2f}")
+        st.markdown(f"### Total: £{from_pence(totals(lines).inc):.2f}")
         if st.button("Clear cart", use_container_width=True):
             clear_cart()
             st.rerun()
 
-def _calc_prices(unit_inc_vat: float, vat_rate: float, qty: int):
-    unit_inc = round(float(unit_inc_vat), 2)
-    vat = float(vat_rate)
-    unit_ex = round(unit_inc / (1.0 + vat/100.0), 2)
-    line_ex = round(unit_ex * qty, 2)
-    line_inc = round(unit_inc * qty, 2)
-    line_vat = round(line_inc - line_ex, 2)
-    return unit_ex, unit_inc, line_ex, line_vat, line_inc
+def _create_customer_order(supabase, payload, line_items):
+    # Order + every line item in one RPC / one transaction (sql_create_customer_order.sql).
+    result = supabase.rpc("customer_create_order", {"p_order": payload, "p_items": line_items})
+    if not result:
+        return None
+    return result[0] if isinstance(result, list) else result
 
 def render_checkout(supabase, customer_row=None, session=None):
     st.subheader("Checkout")
@@ -116,34 +109,30 @@ def render_checkout(supabase, customer_row=None, session=None):
         st.warning("You must accept Terms & Conditions to place an order.")
         return
 
-    products = supabase.table("products").select("id,name,recommended_price_inc_vat,vat_percent").execute()
-    prod_map = {str(p["id"]): p for p in products}
+    products = fetch_products_by_ids(cart.keys(), "id,name,recommended_price_inc_vat,vat_percent", active_only=False, sb=supabase)
+    # All lines priced in one pass, in integer pence.
+    units = {
+        pid: unit_price_from_inc(p.get("recommended_price_inc_vat"), p.get("vat_percent") or VAT_DEFAULT)
+        for pid, p in products.items()
+    }
+    lines = price_lines(units, cart)
+    total = from_pence(totals(lines).inc)
 
-    total = 0.0
     line_items_for_db = []
     line_items_for_rpc = []
 
-    for pid, qty in cart.items():
-        p = prod_map.get(pid)
-        if not p:
-            continue
-        qty_i = int(qty)
-        unit_inc = float(p.get("recommended_price_inc_vat") or 0)
-        vat_rate = float(p.get("vat_percent") or VAT_DEFAULT)
-
-        unit_ex, unit_inc, line_ex, line_vat, line_inc = _calc_prices(unit_inc, vat_rate, qty_i)
-        total += line_inc
-
+    for line in lines:
+        p = products[line.product_id]
         li = {
-            "product_id": int(p["id"]),
+            "product_id": line.product_id,
             "product_name_snapshot": p.get("name", ""),
-            "qty": qty_i,
-            "unit_price_ex_vat": unit_ex,
-            "vat_rate": round(vat_rate, 2),
-            "line_total_ex_vat": line_ex,
-            "line_vat": line_vat,
-            "line_total_inc_vat": line_inc,
-            "unit_price_inc_vat": unit_inc,
+            "qty": line.qty,
+            "unit_price_ex_vat": from_pence(line.unit_ex),
+            "vat_rate": from_pence(line.vat_bp),
+            "line_total_ex_vat": from_pence(line.line_ex),
+            "line_vat": from_pence(line.line_vat),
+            "line_total_inc_vat": from_pence(line.line_inc),
+            "unit_price_inc_vat": from_pence(line.unit_inc),
         }
         line_items_for_db.append(li)
 
@@ -171,26 +160,16 @@ def render_checkout(supabase, customer_row=None, session=None):
             payload = {
                 "order_type": order_type,
                 "payment_method": payment_method,
-                "status": "pending",
                 "total_inc_vat": round(total, 2),
                 "order_notes": (notes or "").strip() or None,
                 "customer_id": int(customer_row["id"]),
-                "customer_auth_user_id": session["user"]["id"],
                 "customer_email_snapshot": session["user"].get("email"),
                 "customer_phone_snapshot": customer_row.get("phone"),
             }
-            created = supabase.table("orders").insert(payload).execute()
-            if not created:
+            order = _create_customer_order(supabase, payload, line_items_for_db)
+            if not order:
                 st.error("Order could not be created.")
                 return
-            order = created[0]
-            oid = order["id"]
-
-            for li in line_items_for_db:
-                supabase.table("order_items").insert({
-                    "order_id": oid,
-                    **li
-                }).execute()
 
             clear_cart()
             st.session_state["last_order_code"] = order.get("order_code")
@@ -215,6 +194,16 @@ def render_checkout(supabase, customer_row=None, session=None):
             st.success(f"Order placed! Your order code is: {order.get('order_code', '(code pending)')}")
             st.rerun()
 
+def _items_by_order(supabase, order_ids):
+    # One in_ query for the whole history, grouped here instead of one query per order.
+    grouped = {oid: [] for oid in order_ids}
+    if not order_ids:
+        return grouped
+    items = supabase.table("order_items").select("*").in_("order_id", list(order_ids)).execute()
+    for it in items:
+        grouped.setdefault(it.get("order_id"), []).append(it)
+    return grouped
+
 def render_my_orders(supabase, session):
     st.subheader("My Orders")
     uid = session["user"]["id"]
@@ -223,6 +212,8 @@ def render_my_orders(supabase, session):
         st.info("No orders yet.")
         return
 
+    items_by_order = _items_by_order(supabase, [o["id"] for o in orders])
+
     for o in orders:
         with st.container(border=True):
             code = o.get("order_code", "Order")
@@ -230,17 +221,15 @@ def render_my_orders(supabase, session):
             st.markdown(f"**{code}** — {status}")
             st.caption(STATUS_HELP.get(status, ""))
 
-            items = supabase.table("order_items").select("*").eq("order_id", o["id"]).execute()
+            items = items_by_order.get(o["id"], [])
             with st.expander("Items"):
                 for it in items:
                     st.write(f"{it.get('qty')} × {it.get('product_name_snapshot')}")
 
             if st.button("Reorder", key=f"reorder_{o['id']}", use_container_width=True):
-                new_cart = {}
+                new_cart = Cart()
                 for it in items:
-                    pid = str(it.get("product_id"))
-                    if pid and pid != "None":
-                        new_cart[pid] = int(it.get("qty") or 0)
+                    new_cart.set(it.get("product_id"), it.get("qty") or 0)
                 st.session_state["cart"] = new_cart
                 st.success("Items added to cart.")
                 st.rerun()
@@ -255,11 +244,15 @@ def render_tracking(supabase):
 
     order = None
     try:
-        res = supabase.rpc("track_order_by_code", {"p_order_code": code.strip()})
+        # Cached by status, so reruns while a code is entered don't each hit the RPC.
+        res = cached_track(code, lambda: supabase.rpc("track_order_by_code", {"p_order_code": code.strip()}), namespace="portal")
         if isinstance(res, list) and res:
             order = res[0]
         elif isinstance(res, dict) and res:
             order = res
+    except TrackingRateLimited as e:
+        st.warning(f"You're checking very often. Please wait {int(e.retry_after) + 1} seconds and try again.")
+        return
     except Exception:
         order = None
 
@@ -1,5 +1,69 @@
 import streamlit as st
-from supabase_client import get_client
+from supabase_client import get_client, pool_stats
+from auth_tokens import get_current_user, local_verifier_configured
+from image_cache import image_cache_stats
+from telemetry import (
+    aggregates, current_rerun, export_jsonl, export_prometheus, rerun_summary, session_calls, view_bytes,
+)
+from token_manager import refresh_stats
+from tracking_cache import tracking_cache_stats
+
+
+def _admin_unlocked() -> bool:
+    if st.session_state.get("_admin_unlocked") or st.session_state.get("_maintenance_unlocked"):
+        return True
+    with st.form("debug_admin_pin"):
+        pin = st.text_input("Admin PIN", type="password")
+        if st.form_submit_button("Show backend calls"):
+            expected = st.secrets.get("CUSTOMER_MAINTENANCE_PIN", "")
+            if expected and pin == expected:
+                st.session_state._admin_unlocked = True
+                return True
+            st.error("Wrong PIN.")
+    return False
+
+
+def _backend_calls_panel():
+    st.subheader("Backend calls")
+    if not _admin_unlocked():
+        return
+
+    events = session_calls()
+    rerun = current_rerun()
+    this_rerun = [e for e in events if e["rerun"] == rerun]
+    st.write(f"This rerun (#{rerun}, so far): {len(this_rerun)} calls, "
+             f"{sum(e['seconds'] for e in this_rerun) * 1000:.0f} ms waiting on Supabase")
+    cols = ["kind", "name", "view", "filters", "seconds", "rows", "bytes", "wire_bytes", "status", "error"]
+    st.dataframe([{c: e[c] for c in cols} for e in this_rerun], use_container_width=True)
+
+    st.caption("Per rerun, this session")
+    st.dataframe(rerun_summary(events), use_container_width=True)
+    with st.expander(f"All calls this session ({len(events)})"):
+        st.dataframe([{c: e.get(c) for c in ["rerun", "fragment"] + cols} for e in reversed(events)],
+                     use_container_width=True)
+
+    st.caption("Process-wide (p50/p95/p99 over recent calls)")
+    st.dataframe(aggregates(), use_container_width=True)
+    st.caption("Bytes per view (decoded vs on the wire)")
+    st.dataframe(view_bytes(), use_container_width=True)
+
+    c1, c2, c3 = st.columns(3)
+    c1.download_button("Session calls (JSON lines)", export_jsonl(events), "calls-session.jsonl", "application/x-ndjson")
+    c2.download_button("All calls (JSON lines)", export_jsonl(), "calls.jsonl", "application/x-ndjson")
+    c3.download_button("Prometheus metrics", export_prometheus(), "metrics.prom", "text/plain")
+
+    with st.expander("Page modules loaded by this process"):
+        from app_shell import page_import_report
+
+        st.dataframe(page_import_report(), use_container_width=True)
+
+    with st.expander("Pools and caches"):
+        st.json({
+            "http_pool": pool_stats(),
+            "token_refresh": refresh_stats(),
+            "tracking_cache": tracking_cache_stats(),
+            "image_cache": image_cache_stats(),
+        })
 
 
 def page_debug_auth():
@@ -11,15 +75,26 @@ def page_debug_auth():
     st.write("sb_tokens present:", bool(st.session_state.get("sb_tokens")))
     st.write(st.session_state.get("sb_tokens") or {})
 
-    st.subheader("Supabase get_user()")
-    try:
-        u = sb.auth.get_user().user
-        st.success("get_user() works ✅")
+    st.subheader("Current user (local token check)")
+    st.write("local verifier configured:", local_verifier_configured())
+    u = get_current_user(sb)
+    if u:
+        st.success("Token accepted ✅")
         st.write("id:", getattr(u, "id", None))
         st.write("email:", getattr(u, "email", None))
-    except Exception as e:
-        st.error("get_user() failed ❌")
-        st.exception(e)
+    else:
+        st.warning("No valid access token.")
+
+    st.subheader("Supabase get_user()")
+    if st.button("Check with auth server"):
+        try:
+            u = sb.auth.get_user(sb.access_token).user
+            st.success("get_user() works ✅")
+            st.write("id:", getattr(u, "id", None))
+            st.write("email:", getattr(u, "email", None))
+        except Exception as e:
+            st.error("get_user() failed ❌")
+            st.exception(e)
 
     st.subheader("auth.uid() via RPC (whoami)")
     try:
@@ -48,3 +123,5 @@ def page_debug_auth():
     except Exception as e:
         st.error("Customer lookup failed ❌")
         st.exception(e)
+
+    _backend_calls_panel()
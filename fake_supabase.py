@@ -0,0 +1,442 @@
+"""In-memory stand-in for the Supabase endpoints the app uses, for offline load tests.
+
+Serves PostgREST tables (products, categories, customers, loyalty_accounts,
+loyalty_transactions, orders, order_items), the RPCs the app calls and the
+GoTrue password/refresh/user/logout endpoints, with injected latency.
+
+    python fake_supabase.py --port 54321 --latency-ms 30 --jitter-ms 10 --products 300
+
+then run the app against it:
+
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_ANON_KEY=anon \\
+    SUPABASE_JWT_SECRET=fake-jwt-secret-for-local-load-tests streamlit run app.py
+
+Seeded logins are user1@example.com .. userN@example.com, password "password".
+"""
+import argparse
+import fnmatch
+import gzip
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import jwt
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JWT_SECRET = "fake-jwt-secret-for-local-load-tests"
+ANON_KEY = "anon"
+TOKEN_SECONDS = 3600
+PASSWORD = "password"
+COMPRESS_MIN_BYTES = 1024  # compress larger responses (br, else gzip) when the client accepts it, like the real gateway
+
+_WORDS = ["sourdough", "rye", "brownie", "croissant", "bun", "tart", "cookie", "loaf", "scone", "muffin",
+          "focaccia", "bagel", "eclair", "flapjack", "pie", "roll", "danish", "cake", "baguette", "pretzel"]
+_ADJ = ["classic", "seeded", "chocolate", "cinnamon", "lemon", "almond", "spelt", "cheese", "raspberry", "vegan"]
+_ALLERGENS = ["gluten", "milk", "eggs", "nuts", "sesame", "soy", "mustard", "sulphites"]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeData:
+    """Tables as lists of dicts plus the auth users; every access holds one lock."""
+
+    def __init__(self, products: int = 200, customers: int = 50, seed: int = 0):
+        rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        self.next_id = Counter()
+        self.tables = {name: [] for name in (
+            "categories", "products", "customers", "loyalty_accounts", "loyalty_transactions", "orders", "order_items",
+        )}
+        self.settings = {"maintenance": {"enabled": False}, "contact": {"email": "shop@example.com"}}
+        self.users = {}  # email -> {"id", "email", "password"}
+        self.refresh_tokens = {}  # refresh token -> user id
+
+        for name in ("Bread", "Pastries", "Cakes", "Biscuits", "Savoury"):
+            self.insert("categories", {"name": name, "description": f"{name} baked daily", "is_active": True})
+        for i in range(products):
+            base = round(rnd.uniform(1.0, 9.0), 2)
+            manual = rnd.random() < 0.3
+            self.insert("products", {
+                "category_id": rnd.randint(1, 5),
+                "name": f"{rnd.choice(_ADJ).title()} {rnd.choice(_WORDS)} {i + 1}",
+                "description": "Freshly baked in Wiveliscombe.",
+                "image_url": None,
+                "is_active": rnd.random() > 0.05,
+                "pricing_mode": "manual" if manual else "recommended",
+                "manual_price_ex_vat": base if manual else None,
+                "recommended_price_ex_vat": None if manual else base,
+                "base_price": base,
+                "apply_vat": rnd.random() < 0.4,
+                "custom_vat_rate": None,
+                "allergens": rnd.sample(_ALLERGENS, rnd.randint(0, 3)),
+            })
+        for i in range(1, customers + 1):
+            uid = str(uuid.UUID(int=rnd.getrandbits(128)))
+            email = f"user{i}@example.com"
+            self.users[email] = {"id": uid, "email": email, "password": PASSWORD}
+            cust = self.insert("customers", {
+                "auth_user_id": uid, "email": email, "full_name": f"Customer {i}", "phone": f"0770000{i:04d}",
+                "address": None, "marketing_consent": False, "allergies": rnd.sample(_ALLERGENS, rnd.randint(0, 2)) or None,
+            })
+            self.insert("loyalty_accounts", {
+                "customer_id": cust["id"], "points_balance": rnd.randint(0, 800), "lifetime_points": 1000, "tier": "bronze",
+            })
+            for _ in range(rnd.randint(0, 8)):
+                self.insert("loyalty_transactions", {
+                    "customer_id": cust["id"], "created_at": _now(), "points_change": rnd.randint(5, 50),
+                    "reason": "order", "order_id": None,
+                })
+
+    def insert(self, table: str, row: dict) -> dict:
+        self.next_id[table] += 1
+        row = {"id": self.next_id[table], "created_at": _now(), **row}
+        self.tables[table].append(row)
+        return row
+
+    def product(self, pid) -> dict | None:
+        return next((p for p in self.tables["products"] if p["id"] == pid), None)
+
+
+# ---- PostgREST query handling ----
+
+def _coerce(raw: str, like):
+    if raw == "null":
+        return None
+    if isinstance(like, bool):
+        return raw.lower() in ("true", "t", "1")
+    if isinstance(like, int):
+        try:
+            return int(raw)
+        except ValueError:
+            return float(raw)
+    if isinstance(like, float):
+        return float(raw)
+    return raw
+
+
+def _match(value, op: str, arg: str) -> bool:
+    if op == "is":
+        return value is None if arg.lower() == "null" else value is (arg.lower() == "true")
+    if op == "in":
+        return value is not None and value in {_coerce(a.strip().strip('"'), value) for a in arg.strip("()").split(",")}
+    if op in ("like", "ilike"):
+        pattern = arg.replace("%", "*")
+        if op == "ilike":
+            return value is not None and fnmatch.fnmatch(str(value).lower(), pattern.lower())
+        return value is not None and fnmatch.fnmatchcase(str(value), pattern)
+    if value is None:
+        return False
+    target = _coerce(arg, value)
+    return {
+        "eq": value == target, "neq": value != target,
+        "gt": value > target, "gte": value >= target, "lt": value < target, "lte": value <= target,
+    }.get(op, False)
+
+
+def _filter(rows, params):
+    for key, expr in params:
+        if key in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+            continue
+        negate = expr.startswith("not.")
+        op, _, arg = expr[4:].partition(".") if negate else expr.partition(".")
+        rows = [r for r in rows if _match(r.get(key), op, arg) != negate]
+    return rows
+
+
+def _shape(rows, params):
+    p = dict(params)
+    for part in reversed((p.get("order") or "").split(",")):
+        if not part:
+            continue
+        col, *mods = part.split(".")
+        present = [r for r in rows if r.get(col) is not None]
+        missing = [r for r in rows if r.get(col) is None]
+        rows = sorted(present, key=lambda r: r[col], reverse="desc" in mods) + missing
+    offset = int(p.get("offset") or 0)
+    rows = rows[offset:offset + int(p["limit"])] if p.get("limit") else rows[offset:]
+    select = (p.get("select") or "*").replace(" ", "")
+    if select != "*":
+        cols = select.split(",")
+        rows = [{c: r.get(c) for c in cols} for r in rows]
+    return rows, offset
+
+
+# ---- RPCs ----
+
+def _order_payload(data: FakeData, order: dict) -> dict:
+    items = [i for i in data.tables["order_items"] if i["order_id"] == order["id"]]
+    return {"order": order, "items": items}
+
+
+def _create_order(data: FakeData, fields: dict, items: list) -> dict:
+    order = data.insert("orders", {"status": "pending", **fields})
+    order["order_code"] = f"WB-{datetime.now():%Y%m%d}-{order['id']:05d}"
+    total = 0.0
+    for it in items:
+        p = data.product(int(it.get("product_id") or 0)) or {}
+        unit_ex = float(it.get("unit_price_ex_vat") or p.get("manual_price_ex_vat") or p.get("recommended_price_ex_vat")
+                        or p.get("base_price") or 0)
+        vat = 0.2 if p.get("apply_vat", True) else 0.0
+        qty = int(it.get("qty") or 1)
+        line_inc = round(unit_ex * (1 + vat) * qty, 2)
+        total += line_inc
+        data.insert("order_items", {
+            "order_id": order["id"], "product_id": p.get("id"),
+            "product_name_snapshot": it.get("product_name") or it.get("product_name_snapshot") or p.get("name"),
+            "qty": qty, "unit_price_ex_vat": unit_ex, "vat_rate": vat * 100,
+            "line_total_ex_vat": round(unit_ex * qty, 2), "line_total_inc_vat": line_inc,
+        })
+    order["total_inc_vat"] = round(total, 2)
+    return order
+
+
+def _rpc(data: FakeData, fn: str, args: dict, uid: str | None):
+    if fn == "get_public_settings":
+        return data.settings
+    if fn == "whoami":
+        return uid
+    if fn == "track_order_by_code":
+        code = (args.get("p_order_code") or "").strip()
+        order = next((o for o in data.tables["orders"] if o["order_code"] == code), None)
+        return _order_payload(data, order) if order else None
+    if fn == "guest_create_order":
+        order = _create_order(data, {
+            "order_type": args.get("p_order_type"), "customer_email": args.get("p_customer_email"),
+            "customer_phone": args.get("p_customer_phone"), "delivery_address": args.get("p_delivery_address"),
+        }, args.get("p_items") or [])
+        return {"order_id": order["id"], "order_code": order["order_code"], "discount_total": 0,
+                "gift_card_applied": 0, "amount_due": order["total_inc_vat"]}
+    if fn == "customer_create_order":
+        order = _create_order(data, {**(args.get("p_order") or {}), "customer_auth_user_id": uid}, args.get("p_items") or [])
+        return [{"order_id": order["id"], "order_code": order["order_code"]}]
+    if fn == "ensure_customer_profile":
+        cust = next((c for c in data.tables["customers"] if c["auth_user_id"] == uid), None)
+        if uid and cust is None:
+            cust = data.insert("customers", {"auth_user_id": uid, "full_name": args.get("p_full_name"), "phone": args.get("p_phone")})
+            data.insert("loyalty_accounts", {"customer_id": cust["id"], "points_balance": 0, "lifetime_points": 0, "tier": "bronze"})
+        return cust["id"] if cust else None
+    if fn == "redeem_loyalty_discount":
+        cust = next((c for c in data.tables["customers"] if c["auth_user_id"] == uid), None)
+        acct = cust and next((a for a in data.tables["loyalty_accounts"] if a["customer_id"] == cust["id"]), None)
+        points = int(args.get("p_points_required") or 0)
+        if not acct or acct["points_balance"] < points:
+            raise LookupError("Not enough points")
+        acct["points_balance"] -= points
+        data.insert("loyalty_transactions", {"customer_id": cust["id"], "created_at": _now(), "points_change": -points,
+                                             "reason": "redeem", "order_id": None})
+        return {"code": f"LOY-{uuid.uuid4().hex[:8].upper()}"}
+    raise KeyError(fn)
+
+
+# ---- HTTP ----
+
+class FakeSupabase:
+    """The data, the latency model and per-endpoint request counts for one fake backend."""
+
+    def __init__(self, data: FakeData | None = None, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+        self.data = data or FakeData()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.requests = Counter()
+        self._count_lock = threading.Lock()
+
+    def delay(self) -> None:
+        ms = self.latency_ms + (random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def count(self, name: str) -> None:
+        with self._count_lock:
+            self.requests[name] += 1
+
+    def issue_tokens(self, user: dict) -> dict:
+        exp = int(time.time()) + TOKEN_SECONDS
+        access = jwt.encode({"sub": user["id"], "email": user["email"], "role": "authenticated", "aud": "authenticated",
+                             "exp": exp}, JWT_SECRET, algorithm="HS256")
+        refresh = uuid.uuid4().hex
+        self.data.refresh_tokens[refresh] = user["id"]
+        return {"access_token": access, "refresh_token": refresh, "token_type": "bearer", "expires_in": TOKEN_SECONDS,
+                "expires_at": exp, "user": self.user_json(user)}
+
+    @staticmethod
+    def user_json(user: dict) -> dict:
+        return {"id": user["id"], "email": user["email"], "aud": "authenticated", "role": "authenticated",
+                "app_metadata": {}, "user_metadata": {}, "created_at": _now()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    backend: FakeSupabase = None
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(n) if n else b""
+        return json.loads(raw) if raw else {}
+
+    def _send(self, status: int, payload=None, headers=None):
+        body = b"" if payload is None and status == 204 else json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        accept = self.headers.get("Accept-Encoding") or ""
+        if len(body) >= COMPRESS_MIN_BYTES and brotli is not None and "br" in accept:
+            body = brotli.compress(body, quality=5)
+            self.send_header("Content-Encoding", "br")
+        elif len(body) >= COMPRESS_MIN_BYTES and "gzip" in accept:
+            body = gzip.compress(body, compresslevel=5)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _uid(self):
+        auth = self.headers.get("Authorization", "")
+        token = auth[7:] if auth.startswith("Bearer ") else ""
+        try:
+            return jwt.decode(token, JWT_SECRET, algorithms=["HS256"], audience="authenticated").get("sub")
+        except jwt.PyJWTError:
+            return None
+
+    def _route(self, method: str):
+        be = self.backend
+        url = urlsplit(self.path)
+        params = parse_qsl(url.query, keep_blank_values=True)
+        path = url.path
+        body = self._body()  # always drain it, or it is read as the next request on this connection
+        be.delay()
+        try:
+            if path.startswith("/auth/v1/"):
+                name = path[len("/auth/v1/"):]
+                be.count(f"auth {method} {name}")
+                return self._auth(method, name, dict(params), body)
+            if path.startswith("/rest/v1/rpc/"):
+                fn = path[len("/rest/v1/rpc/"):]
+                be.count(f"rpc {fn}")
+                with be.data.lock:
+                    result = _rpc(be.data, fn, body if method == "POST" else dict(params), self._uid())
+                return self._send(200, result)
+            if path.startswith("/rest/v1/"):
+                table = path[len("/rest/v1/"):]
+                be.count(f"{method} {table}")
+                return self._table(method, table, params, body)
+        except KeyError as e:
+            return self._send(404, {"code": "PGRST202", "message": f"Could not find the function {e}", "details": None, "hint": None})
+        except LookupError as e:
+            return self._send(400, {"code": "P0001", "message": str(e), "details": None, "hint": None})
+        except Exception as e:
+            return self._send(500, {"code": "XX000", "message": repr(e), "details": None, "hint": None})
+        self._send(404, {"message": f"no route for {path}"})
+
+    def _table(self, method: str, table: str, params, body):
+        data = self.backend.data
+        if table not in data.tables:
+            return self._send(404, {"code": "42P01", "message": f'relation "public.{table}" does not exist'})
+        with data.lock:
+            if method == "POST":
+                rows = [data.insert(table, r) for r in (body if isinstance(body, list) else [body])]
+            else:
+                rows = _filter(data.tables[table], params)
+                if method == "PATCH":
+                    for r in rows:
+                        r.update(body)
+                elif method == "DELETE":
+                    data.tables[table] = [r for r in data.tables[table] if r not in rows]
+            rows, offset = _shape([dict(r) for r in rows], params)
+        if "vnd.pgrst.object" in (self.headers.get("Accept") or ""):
+            if len(rows) != 1:
+                return self._send(406, {"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned"})
+            return self._send(200, rows[0])
+        span = f"{offset}-{offset + len(rows) - 1}" if rows else "*"
+        return self._send(200 if method in ("GET", "PATCH", "DELETE") else 201, rows, {"Content-Range": f"{span}/*"})
+
+    def _auth(self, method: str, path: str, query: dict, body):
+        be = self.backend
+        data = be.data
+        if path == "token":
+            with data.lock:
+                if query.get("grant_type") == "password":
+                    user = data.users.get((body.get("email") or "").lower())
+                    ok = user and user["password"] == body.get("password")
+                else:
+                    uid = data.refresh_tokens.pop(body.get("refresh_token"), None)
+                    user = next((u for u in data.users.values() if u["id"] == uid), None)
+                    ok = user is not None
+                if not ok:
+                    return self._send(400, {"error": "invalid_grant", "error_description": "Invalid login credentials"})
+                return self._send(200, be.issue_tokens(user))
+        if path == "signup":
+            with data.lock:
+                email = (body.get("email") or "").lower()
+                user = data.users.setdefault(email, {"id": str(uuid.uuid4()), "email": email, "password": body.get("password")})
+                return self._send(200, be.issue_tokens(user))
+        if path == "user":
+            uid = self._uid()
+            user = next((u for u in data.users.values() if u["id"] == uid), None)
+            if not user:
+                return self._send(401, {"code": 401, "msg": "invalid JWT"})
+            return self._send(200, be.user_json(user))
+        if path in ("logout", "recover"):
+            return self._send(204)
+        self._send(404, {"message": f"no auth route {path}"})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PATCH(self):
+        self._route("PATCH")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+
+def serve(backend: FakeSupabase, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the fake backend on a daemon thread; port 0 picks a free port (server.server_port)."""
+    handler = type("Handler", (_Handler,), {"backend": backend})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-supabase", daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=54321)
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="added to every request")
+    ap.add_argument("--jitter-ms", type=float, default=10.0, help="plus uniform 0..jitter")
+    ap.add_argument("--products", type=int, default=200)
+    ap.add_argument("--customers", type=int, default=50)
+    args = ap.parse_args()
+
+    backend = FakeSupabase(FakeData(args.products, args.customers), args.latency_ms, args.jitter_ms)
+    server = serve(backend, args.host, args.port)
+    print(f"fake Supabase on http://{args.host}:{server.server_port} "
+          f"(anon key {ANON_KEY!r}, SUPABASE_JWT_SECRET={JWT_SECRET!r}); Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
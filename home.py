@@ -1,12 +1,64 @@
 import streamlit as st
-import streamlit as st
 
-from catalog import fetch_categories, fetch_products, display_price_ex_vat
-from cart import cart_add
+from catalog import fetch_categories, get_catalog_index, get_price_table
+from pricing import unit_price, from_pence
+from cart import cart_add, cart_clear, session_cart
+from config import get_option
+from telemetry import fragment
+
+
+def _cart_badge_text() -> str:
+    cart = session_cart()
+    if not cart.count:
+        return "🧺 Your cart is empty."
+    return f"🧺 {cart.count} item{'s' if cart.count != 1 else ''} · £{from_pence(cart.ex):.2f} ex VAT"
+
+
+def _refresh_cart_badge():
+    # Placeholder owned by the cart summary fragment; st.empty replaces, so nothing accumulates.
+    badge = st.session_state.get("_cart_badge")
+    if badge is not None:
+        badge.markdown(_cart_badge_text())
+
+
+@fragment
+def _cart_summary():
+    st.session_state._cart_badge = st.empty()
+    _refresh_cart_badge()
+    # Always shown: a card's Add to cart reruns only that card, so a button that
+    # depended on the cart's state here would be stale until the next full rerun.
+    st.button("Empty cart", on_click=cart_clear, key="shop_cart_clear")
+    st.caption("Go to Checkout to place your order.")
+
+
+@fragment
+def _product_card(p, price):
+    # A fragment: Qty / Add to cart rerun just this card (and update the cart badge), not the app.
+    with st.container(border=True):
+        c1, c2, c3 = st.columns([2, 1, 1])
+        with c1:
+            st.subheader(p["name"])
+            if p.get("description"):
+                st.write(p["description"])
+        with c2:
+            st.metric("Price (ex VAT)", f"£{from_pence(price.ex):.2f}")
+        with c3:
+            qty = st.number_input("Qty", min_value=1, max_value=50, value=1, step=1, key=f"qty_{p['id']}")
+            if st.button("Add to cart", key=f"add_{p['id']}"):
+                cart_add(int(p["id"]), int(qty))
+                st.success("Added.")
+                _refresh_cart_badge()
+
+
+def _show_more(page_size: int):
+    st.session_state.shop_visible += page_size
 
 
 def page_home():
     st.header("🥐 Wivey Bakery – Shop")
+    # Before the cards, so they write into this run's badge placeholder.
+    with st.sidebar:
+        _cart_summary()
 
     cats = fetch_categories()
     cat_options = [{"id": None, "name": "All"}] + cats
@@ -18,24 +70,23 @@ def page_home():
     with col2:
         q = st.text_input("Search", placeholder="e.g. brownie, sourdough")
 
-    prods = fetch_products(category_id=cat_name_to_id.get(selected), search=q.strip() if q else None)
+    prods = get_catalog_index().search(q, category_id=cat_name_to_id.get(selected))
     if not prods:
         st.info("No products found.")
         return
 
-    for p in prods:
-        with st.container(border=True):
-            c1, c2, c3 = st.columns([2, 1, 1])
-            with c1:
-                st.subheader(p["name"])
-                if p.get("description"):
-                    st.write(p["description"])
-            with c2:
-                st.metric("Price (ex VAT)", f"£{display_price_ex_vat(p):.2f}")
-            with c3:
-                qty = st.number_input("Qty", min_value=1, max_value=50, value=1, step=1, key=f"qty_{p['id']}")
-                if st.button("Add to cart", key=f"add_{p['id']}"):
-                    cart_add(int(p["id"]), int(qty))
-                    st.success("Added.")
-
-    st.sidebar.caption("Go to Checkout to place your order.")
+    # Only build widgets for the visible page(s); "Show more" extends the list.
+    page_size = max(1, get_option("SHOP_PAGE_SIZE", 12))
+    filter_key = (selected, (q or "").strip().lower())
+    if st.session_state.get("shop_filter_key") != filter_key:
+        st.session_state.shop_filter_key = filter_key
+        st.session_state.shop_visible = page_size
+    visible = max(page_size, int(st.session_state.get("shop_visible") or page_size))
+
+    prices = get_price_table()
+    for p in prods[:visible]:
+        _product_card(p, prices.get(int(p["id"])) or unit_price(p))
+
+    if len(prods) > visible:
+        st.caption(f"Showing {visible} of {len(prods)} products")
+        st.button("Show more", on_click=_show_more, args=(page_size,), key="shop_show_more")
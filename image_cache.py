@@ -0,0 +1,193 @@
+from __future__ import annotations
+import hashlib
+import io
+import os
+import threading
+import time
+import httpx
+import streamlit as st
+from PIL import Image
+from config import get_option
+from query_runner import shared_pool
+
+THUMB_WIDTH = 480
+URL_RECHECK_SECONDS = 24 * 3600  # how long a URL -> content mapping is trusted
+FAILED_RETRY_SECONDS = 300
+MAX_INFLIGHT = 4  # concurrent downloads, so misses can't take over the shared pool
+
+
+class _ImageCache:
+    """Bounded on-disk thumbnail cache: URL -> content hash -> resized JPEG."""
+
+    def __init__(self, root: str, max_bytes: int, max_image_bytes: int, pool):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_image_bytes = max_image_bytes
+        self.pool = pool
+        os.makedirs(os.path.join(root, "urls"), exist_ok=True)
+        os.makedirs(os.path.join(root, "thumbs"), exist_ok=True)
+        self.http = httpx.Client(timeout=httpx.Timeout(15.0, connect=5.0), follow_redirects=True)
+        self.lock = threading.Lock()
+        self.memo = {}  # (url, width) -> (checked_at, path or None if the fetch failed)
+        self.inflight = set()  # (url, width) being downloaded
+        self.stats = {"hits": 0, "misses": 0, "errors": 0, "evictions": 0}
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self.lock:
+            self.stats[key] += n
+
+    def _url_file(self, url: str) -> str:
+        return os.path.join(self.root, "urls", hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def _thumb_file(self, content_hash: str, width: int) -> str:
+        return os.path.join(self.root, "thumbs", f"{content_hash}_{width}.jpg")
+
+    def _known_thumb(self, url: str, width: int) -> str | None:
+        url_file = self._url_file(url)
+        try:
+            if time.time() - os.path.getmtime(url_file) > URL_RECHECK_SECONDS:
+                return None
+            with open(url_file, "r", encoding="utf-8") as f:
+                path = self._thumb_file(f.read().strip(), width)
+        except OSError:
+            return None
+        return path if self._touch(path) else None
+
+    @staticmethod
+    def _touch(path: str) -> bool:
+        """Mark a thumbnail as just served (eviction removes the oldest mtime first); False if it's gone."""
+        try:
+            os.utime(path)
+            return True
+        except OSError:
+            return False
+
+    def thumbnail(self, url: str, width: int = THUMB_WIDTH) -> str | None:
+        """Cached thumbnail path, or None while it is being fetched (or after a failed fetch)."""
+        now = time.monotonic()
+        with self.lock:
+            hit = self.memo.get((url, width))
+        if hit and hit[1] is None and now - hit[0] < FAILED_RETRY_SECONDS:
+            return None
+        if hit and hit[1] and now - hit[0] < URL_RECHECK_SECONDS:
+            if self._touch(hit[1]):
+                self._count("hits")
+                return hit[1]
+
+        path = self._known_thumb(url, width)
+        if path:
+            self._count("hits")
+            with self.lock:
+                self.memo[(url, width)] = (now, path)
+            return path
+        self._count("misses")
+        self._schedule(url, width)
+        return None
+
+    def _schedule(self, url: str, width: int) -> None:
+        key = (url, width)
+        with self.lock:
+            if key in self.inflight or len(self.inflight) >= MAX_INFLIGHT:
+                return  # asked for again on a later render
+            self.inflight.add(key)
+        self.pool.submit(self._fill, url, width)
+
+    def _fill(self, url: str, width: int) -> None:
+        path = None
+        try:
+            path = self._fetch(url, width)
+        finally:
+            with self.lock:
+                self.inflight.discard((url, width))
+                self.memo[(url, width)] = (time.monotonic(), path)
+
+    def _download(self, url: str) -> bytes:
+        with self.http.stream("GET", url) as resp:
+            resp.raise_for_status()
+            if int(resp.headers.get("content-length") or 0) > self.max_image_bytes:
+                raise ValueError(f"image larger than {self.max_image_bytes} bytes")
+            buf = bytearray()
+            for chunk in resp.iter_bytes():
+                buf += chunk
+                if len(buf) > self.max_image_bytes:
+                    raise ValueError(f"image larger than {self.max_image_bytes} bytes")
+        return bytes(buf)
+
+    def _fetch(self, url: str, width: int) -> str | None:
+        try:
+            raw = self._download(url)
+            content_hash = hashlib.sha256(raw).hexdigest()[:32]
+            path = self._thumb_file(content_hash, width)
+            if not os.path.exists(path):
+                img = Image.open(io.BytesIO(raw))
+                img = img.convert("RGB")
+                if img.width > width:
+                    img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                img.save(tmp, "JPEG", quality=82, optimize=True, progressive=True)
+                os.replace(tmp, path)
+            with open(self._url_file(url), "w", encoding="utf-8") as f:
+                f.write(content_hash)
+            self._evict()
+            return path
+        except Exception:
+            self._count("errors")
+            return None
+
+    def _evict(self) -> None:
+        thumbs_dir = os.path.join(self.root, "thumbs")
+        entries = []
+        for name in os.listdir(thumbs_dir):
+            p = os.path.join(thumbs_dir, name)
+            try:
+                st_ = os.stat(p)
+            except OSError:
+                continue
+            entries.append((st_.st_mtime, st_.st_size, p))
+        total = sum(e[1] for e in entries)
+        if total <= self.max_bytes:
+            return
+        for _mtime, size, p in sorted(entries):
+            try:
+                os.remove(p)
+            except OSError:
+                continue
+            self._count("evictions")
+            total -= size
+            if total <= self.max_bytes:
+                break
+        with self.lock:
+            self.memo = {k: v for k, v in self.memo.items() if v[1] is None or os.path.exists(v[1])}
+
+
+@st.cache_resource(show_spinner=False)
+def _image_cache(root: str, max_mb: int, max_image_mb: int) -> _ImageCache:
+    return _ImageCache(root, max_mb * 1024 * 1024, max_image_mb * 1024 * 1024, shared_pool())
+
+
+def _get_cache() -> _ImageCache:
+    return _image_cache(
+        get_option("IMAGE_CACHE_DIR", ".image_cache"),
+        get_option("IMAGE_CACHE_MAX_MB", 200),
+        get_option("IMAGE_MAX_DOWNLOAD_MB", 10),
+    )
+
+
+def thumbnail(url: str, width: int = THUMB_WIDTH):
+    """Local thumbnail path for a product image, or the original URL until one is cached.
+
+    Misses are downloaded in the background on the shared pool, never during the render.
+    """
+    if not url:
+        return None
+    return _get_cache().thumbnail(url, width) or url
+
+
+def image_cache_stats() -> dict:
+    c = _get_cache()
+    with c.lock:
+        stats = dict(c.stats)
+        stats["fetching"] = len(c.inflight)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    return stats
@@ -0,0 +1,224 @@
+"""Offline load test: simulated customer sessions driving app_shell.run_app against fake_supabase.
+
+    python loadtest.py --sessions 8 --duration 60 --latency-ms 30 --jitter-ms 10
+    python loadtest.py --sessions 4 --journeys 5 --flows browse search --json results.json
+
+Each journey is a new visitor: open the shop, then run the chosen flows in order
+(browse: category + "Show more"; search; checkout: add to cart, place a guest
+order; track: look up the order just placed). Every rerun is timed and charged
+the backend calls recorded by telemetry.py during it.
+
+Sessions run in separate worker processes because streamlit's AppTest swaps
+process-global runtime state on every run. st.cache_* is therefore per session,
+not shared the way it is between sessions of one server, so backend calls per
+rerun are an upper bound for a warm multi-user process.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from fake_supabase import ANON_KEY, JWT_SECRET, FakeData, FakeSupabase, serve
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+FLOWS = ("browse", "search", "checkout", "track")
+SEARCH_TERMS = ["bun", "sourdough", "choc", "lemon tart", "seeded", "rye", "cake", "xyz"]
+
+
+def _by_label(widgets, label):
+    for w in widgets:
+        if w.label == label:
+            return w
+    raise LookupError(f"no widget labelled {label!r}")
+
+
+class _Journey:
+    """One simulated visitor: an AppTest session plus the samples it produced."""
+
+    def __init__(self, app_test, rnd, samples):
+        self.at = app_test
+        self.rnd = rnd
+        self.samples = samples
+        self.order_code = None
+
+    def step(self, flow: str, name: str, action) -> None:
+        from telemetry import aggregates
+
+        before = sum(a["count"] for a in aggregates())
+        started = time.time()
+        t0 = time.perf_counter()
+        error = None
+        try:
+            action()
+            if self.at.exception:
+                error = self.at.exception[0].message
+        except Exception as e:
+            error = repr(e)
+        self.samples.append({
+            "flow": flow,
+            "step": name,
+            "started": started,
+            "seconds": time.perf_counter() - t0,
+            "calls": sum(a["count"] for a in aggregates()) - before,
+            "error": error,
+        })
+
+    def go(self, page: str) -> None:
+        self.step("nav", page, lambda: _by_label(self.at.radio, "Menu").set_value(page).run())
+
+    def open(self) -> None:
+        self.step("open", "first load", self.at.run)
+
+    def browse(self) -> None:
+        cats = [o for o in _by_label(self.at.selectbox, "Category").options if o != "All"]
+        self.step("browse", "category", lambda: _by_label(self.at.selectbox, "Category").select(self.rnd.choice(cats)).run())
+        more = [b for b in self.at.button if b.key == "shop_show_more"]
+        if more:
+            self.step("browse", "show more", lambda: more[0].click().run())
+        self.step("browse", "all", lambda: _by_label(self.at.selectbox, "Category").select("All").run())
+
+    def search(self) -> None:
+        term = self.rnd.choice(SEARCH_TERMS)
+        self.step("search", "query", lambda: _by_label(self.at.text_input, "Search").input(term).run())
+        self.step("search", "clear", lambda: _by_label(self.at.text_input, "Search").input("").run())
+
+    def checkout(self) -> None:
+        adds = [b for b in self.at.button if (b.key or "").startswith("add_")]
+        for b in self.rnd.sample(adds, min(len(adds), self.rnd.randint(1, 3))):
+            self.step("checkout", "add to cart", lambda b=b: b.click().run())
+        self.go("Checkout")
+
+        def fill():
+            _by_label(self.at.text_input, "Email (for tracking)").input(f"load{self.rnd.randint(1, 10**6)}@example.com")
+            _by_label(self.at.text_input, "Mobile number (required)").input("07700900000").run()
+
+        self.step("checkout", "details", fill)
+        self.step("checkout", "place order", lambda: _by_label(self.at.button, "Place order").click().run())
+        for s in self.at.success:
+            m = re.search(r"tracking code is: (\S+)", s.value)
+            if m:
+                self.order_code = m.group(1)
+        self.go("Shop")
+
+    def track(self) -> None:
+        code = self.order_code or f"WB-00000000-{self.rnd.randint(1, 99999):05d}"
+        self.go("Track order")
+        self.step("track", "enter code", lambda: _by_label(self.at.text_input, "Enter your order code").input(code).run())
+        self.step("track", "track", lambda: _by_label(self.at.button, "Track order").click().run())
+        self.go("Shop")
+
+
+def _session(index: int, url: str, flows: list, duration: float, journeys: int, seed: int) -> list:
+    """Worker process: run journeys until the time or journey budget is spent; returns the samples."""
+    # Empty secrets file so st.secrets lookups fall through to the env vars below.
+    home = tempfile.mkdtemp(prefix="loadtest-")
+    os.makedirs(os.path.join(home, ".streamlit"))
+    open(os.path.join(home, ".streamlit", "secrets.toml"), "w").close()
+    os.environ.update(
+        HOME=home,
+        SUPABASE_URL=url,
+        SUPABASE_ANON_KEY=ANON_KEY,
+        SUPABASE_JWT_SECRET=JWT_SECRET,
+        ORDER_UPDATES_SOURCE="local",  # no realtime websocket to the fake backend
+    )
+    sys.path.insert(0, APP_DIR)
+    from streamlit.testing.v1 import AppTest
+
+    rnd = random.Random(seed * 1000 + index)
+    samples = []
+    deadline = time.monotonic() + duration
+    done = 0
+    while (journeys and done < journeys) or (not journeys and time.monotonic() < deadline):
+        j = _Journey(AppTest.from_file(os.path.join(APP_DIR, "app.py"), default_timeout=60), rnd, samples)
+        j.open()
+        for flow in flows:
+            getattr(j, flow)()
+        done += 1
+    return samples
+
+
+def _pct(values, q: float) -> float:
+    v = sorted(values)
+    return v[min(len(v) - 1, int(len(v) * q))] if v else 0.0
+
+
+def _report(samples: list, backend) -> str:
+    lines = []
+    n = len(samples)
+    # Wall time from the first rerun to the last, leaving out worker start-up.
+    wall = max((s["started"] + s["seconds"] for s in samples), default=0) - min((s["started"] for s in samples), default=0)
+    wall = max(wall, 1e-9)
+    errors = sum(1 for s in samples if s["error"])
+    secs = [s["seconds"] for s in samples]
+    calls = [s["calls"] for s in samples]
+    lines.append(f"reruns: {n} in {wall:.1f}s = {n / wall:.2f} reruns/s, errors: {errors}")
+    lines.append(
+        f"rerun latency ms: p50 {_pct(secs, .5) * 1000:.0f}  p95 {_pct(secs, .95) * 1000:.0f}  p99 {_pct(secs, .99) * 1000:.0f}"
+    )
+    lines.append(f"backend calls per rerun: mean {sum(calls) / max(1, n):.2f}  p95 {_pct(calls, .95):.0f}  max {max(calls, default=0)}")
+    lines.append("")
+    lines.append(f"{'flow / step':32} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'calls/rerun':>12} {'errors':>7}")
+    groups = defaultdict(list)
+    for s in samples:
+        groups[f"{s['flow']} / {s['step']}"].append(s)
+    for name, g in sorted(groups.items()):
+        t = [s["seconds"] * 1000 for s in g]
+        c = sum(s["calls"] for s in g) / len(g)
+        e = sum(1 for s in g if s["error"])
+        lines.append(f"{name:32} {len(g):7d} {_pct(t, .5):8.0f} {_pct(t, .95):8.0f} {_pct(t, .99):8.0f} {c:12.2f} {e:7d}")
+    if backend is not None:
+        lines.append("")
+        lines.append("backend requests:")
+        for name, count in backend.requests.most_common():
+            lines.append(f"  {name:40} {count}")
+    first_errors = {s["error"] for s in samples if s["error"]}
+    if first_errors:
+        lines.append("")
+        lines.append("errors (distinct):")
+        lines.extend(f"  {e[:200]}" for e in sorted(first_errors)[:10])
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=4, help="concurrent simulated sessions")
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds per session (ignored with --journeys)")
+    ap.add_argument("--journeys", type=int, default=0, help="journeys per session instead of a time budget")
+    ap.add_argument("--flows", nargs="+", choices=FLOWS, default=list(FLOWS))
+    ap.add_argument("--latency-ms", type=float, default=30.0, help="fake backend latency per request")
+    ap.add_argument("--jitter-ms", type=float, default=10.0)
+    ap.add_argument("--products", type=int, default=200)
+    ap.add_argument("--backend-url", help="use an already running fake_supabase.py instead of starting one")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="write every rerun sample here")
+    args = ap.parse_args()
+
+    backend = None
+    url = args.backend_url
+    if not url:
+        backend = FakeSupabase(FakeData(args.products, seed=args.seed), args.latency_ms, args.jitter_ms)
+        url = f"http://127.0.0.1:{serve(backend).server_port}"
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.sessions, mp_context=ctx) as pool:
+        futures = [
+            pool.submit(_session, i, url, args.flows, args.duration, args.journeys, args.seed)
+            for i in range(args.sessions)
+        ]
+        samples = [s for f in futures for s in f.result()]
+
+    print(_report(samples, backend))
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(samples, fh)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
+import time
 import streamlit as st
 from supabase_client import get_client
+from query_runner import run_queries, value_or
+from auth_tokens import get_current_user
 
 REWARDS = [
     {"points": 100, "type": "fixed", "amount": 2.00, "title": "£2 off"},
@@ -8,21 +11,67 @@ REWARDS = [
 ]
 
 def _get_user(sb):
-    try:
-        return sb.auth.get_user().user
-    except Exception:
-        return None
+    return get_current_user(sb)
 
-def page_loyalty():
-    st.header("🎁 Loyalty")
-    sb = get_client()
+TX_LIMIT = 20
+ACCOUNT_TTL_SECONDS = 30  # balance/tier can change without a ledger row (tier moves, admin edits)
+EMPTY_ACCOUNT = {"points_balance": 0, "lifetime_points": 0, "tier": None}
 
-    user = _get_user(sb)
-    if not user:
-        st.info("Log in to view your loyalty points and redeem rewards.")
-        return
 
-    uid = user.id
+def _fetch_account(sb, customer_id):
+    acct = (
+        sb.table("loyalty_accounts")
+        .select("points_balance,lifetime_points,tier")
+        .eq("customer_id", customer_id)
+        .limit(1)
+        .execute()
+        .data
+    )
+    return acct[0] if acct else dict(EMPTY_ACCOUNT)
+
+
+def _fetch_tx(sb, customer_id, newer_than=None):
+    try:
+        q = (
+            sb.table("loyalty_transactions")
+            .select("id,created_at,points_change,reason,order_id")
+            .eq("customer_id", customer_id)
+        )
+        if newer_than:
+            # gte, not gt: rows sharing the newest timestamp may not all have been seen yet.
+            q = q.gte("created_at", newer_than)
+        return q.order("created_at", desc=True).order("id", desc=True).limit(TX_LIMIT).execute().data or []
+    except Exception:
+        return []
+
+
+def _loyalty_snapshot(sb, uid):
+    """Per-session loyalty state; after the first load a view costs one ledger query,
+    plus an account read when it is older than ACCOUNT_TTL_SECONDS."""
+    snap = st.session_state.get("loyalty_snapshot")
+    if snap and snap["uid"] == uid:
+        customer_id = snap["customer_id"]
+        newest = snap["tx"][0]["created_at"] if snap["tx"] else None
+        queries = {"tx": lambda: _fetch_tx(sb, customer_id, newer_than=newest)}
+        if time.monotonic() - snap.get("account_at", 0.0) >= ACCOUNT_TTL_SECONDS:
+            queries["account"] = lambda: _fetch_account(sb, customer_id)
+        res = run_queries(queries)
+        seen = {t.get("id") for t in snap["tx"]}
+        new_tx = [t for t in value_or(res["tx"], []) if t.get("id") not in seen]
+        if new_tx:
+            snap["tx"] = (new_tx + snap["tx"])[:TX_LIMIT]
+        delta = sum(int(t.get("points_change") or 0) for t in new_tx)
+        if "account" in res and res["account"].ok:
+            snap["account"] = res["account"].value
+            snap["account_at"] = time.monotonic()
+            snap["pending_delta"] = 0
+        elif new_tx and delta == snap["pending_delta"]:
+            snap["pending_delta"] = 0  # only our own redemptions: balance already applied
+        elif new_tx:
+            snap["account"] = _fetch_account(sb, customer_id)
+            snap["account_at"] = time.monotonic()
+            snap["pending_delta"] = 0
+        return snap
 
     # Ensure customer profile exists
     try:
@@ -42,22 +91,43 @@ def page_loyalty():
         .data
     )
     if not cust:
-        st.error("You're logged in, but your customer profile isn't visible yet.")
-        st.caption("Fix: ensure supabase_client.py restores session tokens in get_client().")
-        return
+        return None
 
     customer_id = cust[0]["id"]
+    res = run_queries({
+        "account": lambda: _fetch_account(sb, customer_id),
+        "tx": lambda: _fetch_tx(sb, customer_id),
+    })
+    snap = {
+        "uid": uid,
+        "customer_id": customer_id,
+        "account": value_or(res["account"], dict(EMPTY_ACCOUNT)),
+        "account_at": time.monotonic(),
+        "tx": value_or(res["tx"], []),
+        "pending_delta": 0,
+    }
+    st.session_state.loyalty_snapshot = snap
+    return snap
 
-    acct = (
-        sb.table("loyalty_accounts")
-        .select("points_balance,lifetime_points,tier")
-        .eq("customer_id", customer_id)
-        .limit(1)
-        .execute()
-        .data
-    )
-    acct = acct[0] if acct else {"points_balance": 0, "lifetime_points": 0, "tier": None}
 
+def page_loyalty():
+    st.header("🎁 Loyalty")
+    sb = get_client()
+
+    user = _get_user(sb)
+    if not user:
+        st.info("Log in to view your loyalty points and redeem rewards.")
+        return
+
+    uid = user.id
+
+    snap = _loyalty_snapshot(sb, uid)
+    if not snap:
+        st.error("You're logged in, but your customer profile isn't visible yet.")
+        st.caption("Fix: ensure supabase_client.py restores session tokens in get_client().")
+        return
+
+    acct = snap["account"]
     points = int(acct.get("points_balance") or 0)
     lifetime = int(acct.get("lifetime_points") or 0)
     tier = acct.get("tier") or "—"
@@ -122,6 +192,9 @@ def page_loyalty():
                             },
                         ).execute()
                         data = resp.data or {}
+                        # Optimistic: the matching ledger row arrives on the next sync.
+                        snap["account"]["points_balance"] = points - r["points"]
+                        snap["pending_delta"] -= r["points"]
                         st.session_state.last_reward_code = data.get("code")
                         st.session_state.last_reward_validity = f"Valid until: {data.get('valid_to')}"
                         st.rerun()
@@ -131,18 +204,7 @@ def page_loyalty():
 
     st.divider()
     st.subheader("Recent activity")
-    try:
-        tx = (
-            sb.table("loyalty_transactions")
-            .select("created_at,points_change,reason,order_id")
-            .eq("customer_id", customer_id)
-            .order("created_at", desc=True)
-            .limit(20)
-            .execute()
-            .data
-        ) or []
-    except Exception:
-        tx = []
+    tx = snap["tx"]
 
     if not tx:
         st.caption("No activity yet.")
@@ -1,12 +1,14 @@
 import streamlit as st
+from settings import maintenance_enabled, contact_email
 
 def customer_maintenance_gate():
     # IMPORTANT: do NOT call st.set_page_config() in here
-    if not st.secrets.get("CUSTOMER_MAINTENANCE_MODE", False):
+    # Same cached snapshot as app_shell; the secret is a local override.
+    if not (st.secrets.get("CUSTOMER_MAINTENANCE_MODE", False) or maintenance_enabled()):
         return
 
     pin_required = str(st.secrets.get("CUSTOMER_MAINTENANCE_PIN", ""))
-    email = st.secrets.get("CUSTOMER_MAINTENANCE_EMAIL", "wiveybakery@outlook.com")
+    email = st.secrets.get("CUSTOMER_MAINTENANCE_EMAIL") or contact_email()
 
     st.markdown("## 🛠 Website under maintenance")
     st.write("Please try again later.")
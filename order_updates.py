@@ -0,0 +1,257 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import threading
+import time
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from config import get_option
+from supabase_client import _get_cfg
+from tracking_cache import invalidate_tracking
+
+WATCH_IDLE_SECONDS = 300  # a session that stops asking is dropped from the watch list
+RECONNECT_MAX_SECONDS = 60
+TOPIC_PREFIX = "order-status:"  # realtime broadcast topic per order code (sql_order_status_broadcast.sql)
+TOPIC_SYNC_SECONDS = 1.0
+
+log = logging.getLogger(__name__)
+
+
+class OrderStatusHub:
+    """One process-wide feed of order status changes, fanned out to the sessions watching each code."""
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        self.status = {}  # order_code -> (status, updated_at)
+        self.watchers = {}  # order_code -> {session_id: last_seen}
+        self.events = 0
+        self.connected = False
+
+    def publish(self, order_code: str, status: str) -> None:
+        if not order_code or not status:
+            return
+        with self.lock:
+            self.events += 1
+            if order_code not in self.watchers:
+                return  # nobody is waiting on this one
+            prev = self.status.get(order_code)
+            self.status[order_code] = (status, time.time())
+        if self.on_change and (not prev or prev[0] != status):
+            self.on_change(order_code)
+
+    def seed(self, order_code: str, status: str) -> None:
+        with self.lock:
+            self.status.setdefault(order_code, (status, time.time()))
+
+    def watch(self, session_id: str, order_code: str):
+        now = time.time()
+        with self.lock:
+            self.watchers.setdefault(order_code, {})[session_id] = now
+            self._prune(now)
+            return self.status.get(order_code)
+
+    def unwatch(self, session_id: str) -> None:
+        with self.lock:
+            for code in list(self.watchers):
+                self.watchers[code].pop(session_id, None)
+                if not self.watchers[code]:
+                    del self.watchers[code]
+                    self.status.pop(code, None)
+
+    def _prune(self, now: float) -> None:
+        for code in list(self.watchers):
+            sessions = {s: t for s, t in self.watchers[code].items() if now - t < WATCH_IDLE_SECONDS}
+            if sessions:
+                self.watchers[code] = sessions
+            else:
+                del self.watchers[code]
+                self.status.pop(code, None)
+
+    def watched(self) -> set:
+        with self.lock:
+            return set(self.watchers)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "connected": self.connected,
+                "watched_orders": len(self.watchers),
+                "watching_sessions": len({s for w in self.watchers.values() for s in w}),
+                "events": self.events,
+            }
+
+
+class LocalSource:
+    """In-process stand-in for tests/dev: call publish() to simulate a status change."""
+
+    def start(self, hub: OrderStatusHub) -> None:
+        self.hub = hub
+        hub.connected = True
+
+    def publish(self, order_code: str, status: str) -> None:
+        self.hub.publish(order_code, status)
+
+
+class RealtimeSource:
+    """Supabase Realtime broadcasts of {order_code, status}, one topic per watched code.
+
+    The topics are fed by the trigger in sql_order_status_broadcast.sql, so only the code
+    and status leave the database and anon needs no access to public.orders.
+    """
+
+    def __init__(self, url: str, anon: str):
+        self.ws_url = url.rstrip("/").replace("http", "ws", 1) + f"/realtime/v1/websocket?apikey={anon}&vsn=1.0.0"
+        self.anon = anon
+        self.joined = set()  # order codes joined (or being joined) on the current socket
+        self.pending = {}  # ref -> (topic, event) awaiting a phx_reply
+        self.ref = 0
+
+    def start(self, hub: OrderStatusHub) -> None:
+        self.hub = hub
+        threading.Thread(target=lambda: asyncio.run(self._run()), name="order-updates", daemon=True).start()
+
+    async def _run(self) -> None:
+        import websockets
+
+        delay = 1
+        while True:
+            self.joined, self.pending = set(), {}
+            try:
+                async with websockets.connect(self.ws_url) as ws:
+                    # The first heartbeat's reply confirms the socket; the hub reports
+                    # connected only once a phx_reply comes back ok.
+                    await self._send(ws, "phoenix", "heartbeat", {})
+                    tasks = [asyncio.create_task(self._heartbeat(ws)), asyncio.create_task(self._sync_topics(ws))]
+                    try:
+                        async for raw in ws:
+                            self._handle(json.loads(raw))
+                    finally:
+                        for t in tasks:
+                            t.cancel()
+            except Exception:
+                log.warning("order status feed disconnected; retrying in %ss", delay, exc_info=True)
+            delay = 1 if self.hub.connected else min(delay * 2, RECONNECT_MAX_SECONDS)
+            self.hub.connected = False
+            await asyncio.sleep(delay)
+
+    async def _send(self, ws, topic: str, event: str, payload: dict) -> None:
+        self.ref += 1
+        ref = str(self.ref)
+        self.pending[ref] = (topic, event)
+        await ws.send(json.dumps({"topic": topic, "event": event, "payload": payload, "ref": ref}))
+
+    async def _heartbeat(self, ws) -> None:
+        while True:
+            await asyncio.sleep(25)
+            await self._send(ws, "phoenix", "heartbeat", {})
+
+    async def _sync_topics(self, ws) -> None:
+        """Join the topics of newly watched codes and leave the ones nobody watches any more."""
+        while True:
+            wanted = self.hub.watched()
+            for code in wanted - self.joined:
+                self.joined.add(code)
+                await self._send(ws, f"realtime:{TOPIC_PREFIX}{code}", "phx_join", {
+                    "config": {"broadcast": {"self": False}, "presence": {"key": ""}, "private": False},
+                    "access_token": self.anon,
+                })
+            for code in self.joined - wanted:
+                self.joined.discard(code)
+                await self._send(ws, f"realtime:{TOPIC_PREFIX}{code}", "phx_leave", {})
+            await asyncio.sleep(TOPIC_SYNC_SECONDS)
+
+    def _handle(self, msg: dict) -> None:
+        event = msg.get("event")
+        payload = msg.get("payload") or {}
+        if event == "phx_reply":
+            topic, sent = self.pending.pop(msg.get("ref"), (None, None))
+            if payload.get("status") == "ok":
+                self.hub.connected = True
+            elif sent == "phx_join":
+                # Dropped from joined, so the next sync retries it.
+                log.warning("could not join %s: %s", topic, payload.get("response"))
+                self.joined.discard(topic.split(TOPIC_PREFIX, 1)[-1])
+            return
+        if event != "broadcast":
+            return
+        data = payload.get("payload") or {}
+        code = data.get("order_code")
+        if msg.get("topic") == f"realtime:{TOPIC_PREFIX}{code}":
+            self.hub.publish(code, data.get("status"))
+
+
+class PgNotifySource:
+    """LISTEN/NOTIFY stand-in; expects NOTIFY <channel>, '{"order_code": ..., "status": ...}'."""
+
+    def __init__(self, dsn: str, channel: str = "order_status"):
+        self.dsn = dsn
+        self.channel = channel
+
+    def start(self, hub: OrderStatusHub) -> None:
+        try:
+            import psycopg
+        except ImportError as e:
+            raise RuntimeError(
+                'ORDER_UPDATES_SOURCE=pg needs psycopg: pip install "psycopg[binary]" (see requirements.txt).'
+            ) from e
+        self.hub = hub
+        threading.Thread(target=self._run, args=(psycopg,), name="order-updates", daemon=True).start()
+
+    def _run(self, psycopg) -> None:
+        delay = 1
+        while True:
+            try:
+                with psycopg.connect(self.dsn, autocommit=True) as conn:
+                    conn.execute(f'listen "{self.channel}"')
+                    self.hub.connected = True
+                    delay = 1
+                    for note in conn.notifies():
+                        data = json.loads(note.payload or "{}")
+                        self.hub.publish(data.get("order_code"), data.get("status"))
+            except Exception:
+                log.warning("order status LISTEN failed; retrying in %ss", delay, exc_info=True)
+            self.hub.connected = False
+            time.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+
+def _make_source(kind: str):
+    if kind == "local":
+        return LocalSource()
+    if kind == "pg":
+        return PgNotifySource(_get_cfg("ORDER_UPDATES_PG_DSN"), get_option("ORDER_UPDATES_PG_CHANNEL", "order_status"))
+    return RealtimeSource(_get_cfg("SUPABASE_URL"), _get_cfg("SUPABASE_ANON_KEY"))
+
+
+@st.cache_resource(show_spinner=False)
+def _hub(kind: str):
+    # Pushed changes also drop the stale tracking-cache entry.
+    hub = OrderStatusHub(on_change=invalidate_tracking)
+    source = _make_source(kind)
+    source.start(hub)
+    return hub, source
+
+
+def get_hub() -> OrderStatusHub:
+    """The process's single subscription, started on first use (ORDER_UPDATES_SOURCE: realtime | pg | local)."""
+    return _hub(get_option("ORDER_UPDATES_SOURCE", "realtime"))[0]
+
+
+def get_source():
+    return _hub(get_option("ORDER_UPDATES_SOURCE", "realtime"))[1]
+
+
+def _session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "no-session"
+
+
+def watch_order(order_code: str):
+    """Register this session as watching order_code; returns (status, updated_at) or None."""
+    return get_hub().watch(_session_id(), order_code)
+
+
+def unwatch_orders() -> None:
+    get_hub().unwatch(_session_id())
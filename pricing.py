@@ -0,0 +1,122 @@
+from __future__ import annotations
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from typing import NamedTuple
+
+VAT_DEFAULT_RATE = 20.0  # percent; fallback when a product has no rate of its own
+
+
+class UnitPrice(NamedTuple):
+    """Per-unit price in integer pence; vat_bp is the VAT rate in basis points (20% = 2000)."""
+    ex: int
+    vat: int
+    inc: int
+    vat_bp: int
+
+
+class Line(NamedTuple):
+    product_id: int
+    qty: int
+    unit_ex: int
+    unit_inc: int
+    line_ex: int
+    line_vat: int
+    line_inc: int
+    vat_bp: int
+
+
+def to_pence(amount) -> int:
+    if amount is None:
+        return 0
+    return int(Decimal(str(amount)).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_pence(pence: int) -> float:
+    return pence / 100
+
+
+def rate_bp(rate_percent) -> int:
+    return to_pence(rate_percent)  # same scale: 20.00% -> 2000
+
+
+def _div_half_up(num: int, den: int) -> int:
+    return (2 * num + den) // (2 * den)
+
+
+def _ex_choice(p: dict):
+    # Mirrors DB pricing choice used in guest_create_order
+    mode = (p.get("pricing_mode") or "auto")
+    if mode == "manual" and p.get("manual_price_ex_vat") is not None:
+        return p["manual_price_ex_vat"]
+    if p.get("recommended_price_ex_vat") is not None:
+        return p["recommended_price_ex_vat"]
+    if p.get("base_price") is not None:
+        return p["base_price"]
+    return 0
+
+
+def _vat_choice(p: dict):
+    if p.get("apply_vat") is False:
+        return 0
+    if p.get("custom_vat_rate") is not None:
+        return p["custom_vat_rate"]
+    return VAT_DEFAULT_RATE
+
+
+@lru_cache(maxsize=8192)
+def _unit_from_ex(ex_amount, vat_rate) -> UnitPrice:
+    ex = to_pence(ex_amount)
+    bp = rate_bp(vat_rate)
+    vat = _div_half_up(ex * bp, 10000)
+    return UnitPrice(ex, vat, ex + vat, bp)
+
+
+@lru_cache(maxsize=8192)
+def _unit_from_inc(inc_amount, vat_rate) -> UnitPrice:
+    inc = to_pence(inc_amount)
+    bp = rate_bp(vat_rate)
+    ex = _div_half_up(inc * 10000, 10000 + bp)
+    return UnitPrice(ex, inc - ex, inc, bp)
+
+
+def unit_price(p: dict) -> UnitPrice:
+    """Unit price of a catalog product (ex-VAT pricing columns)."""
+    return _unit_from_ex(_ex_choice(p), _vat_choice(p))
+
+
+def unit_price_from_inc(unit_inc_vat, vat_rate=VAT_DEFAULT_RATE) -> UnitPrice:
+    """Unit price when only the inc-VAT price and rate are known (ex-VAT derived)."""
+    return _unit_from_inc(unit_inc_vat or 0, vat_rate if vat_rate is not None else VAT_DEFAULT_RATE)
+
+
+def price_products(products) -> dict:
+    """{product_id: UnitPrice} for a whole list of products at once."""
+    return {int(p["id"]): unit_price(p) for p in products}
+
+
+def price_lines(units: dict, quantities: dict) -> list[Line]:
+    """Price cart lines: units {product_id: UnitPrice}, quantities {product_id: qty}.
+
+    Lines are unit * qty in pence, so line totals never drift from their units.
+    Products missing from units are skipped.
+    """
+    lines = []
+    for pid, qty in quantities.items():
+        try:
+            pid = int(pid)
+        except (TypeError, ValueError):
+            continue
+        u = units.get(pid)
+        if u is None:
+            continue
+        q = int(qty)
+        line_ex = u.ex * q
+        line_inc = u.inc * q
+        lines.append(Line(pid, q, u.ex, u.inc, line_ex, line_inc - line_ex, line_inc, u.vat_bp))
+    return lines
+
+
+def totals(lines) -> UnitPrice:
+    ex = sum(li.line_ex for li in lines)
+    inc = sum(li.line_inc for li in lines)
+    return UnitPrice(ex, inc - ex, inc, 0)
@@ -1,11 +1,9 @@
 import streamlit as st
 from supabase_client import get_client
+from auth_tokens import get_current_user
 
 def _get_user(sb):
-    try:
-        return sb.auth.get_user().user
-    except Exception:
-        return None
+    return get_current_user(sb)
 
 def page_profile():
     st.header("👤 Profile")
@@ -0,0 +1,85 @@
+from __future__ import annotations
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, NamedTuple
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+from config import get_option
+
+DEFAULT_TIMEOUT = 10.0
+
+
+class QueryResult(NamedTuple):
+    value: Any = None
+    error: BaseException | None = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@st.cache_resource(show_spinner=False)
+def _executor(max_workers: int) -> ThreadPoolExecutor:
+    # Bounded and shared by every session in the process.
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="page-query")
+
+
+def shared_pool() -> ThreadPoolExecutor:
+    """The process's bounded worker pool (PAGE_QUERY_WORKERS), also used for background cache fills."""
+    return _executor(get_option("PAGE_QUERY_WORKERS", 16))
+
+
+def _run_with_ctx(fn: Callable[[], Any], ctx) -> QueryResult:
+    thread = threading.current_thread()
+    # Put back whatever was there: nothing on a pool thread (so no session outlives its
+    # query), the caller's own ctx when run inline on the script thread.
+    # add_script_run_ctx(thread, None) can't clear it; None means "the current ctx".
+    saved = getattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+    add_script_run_ctx(thread, ctx)  # lets queries use st.session_state / st caches
+    t0 = time.perf_counter()
+    try:
+        return QueryResult(fn(), None, time.perf_counter() - t0)
+    except Exception as e:
+        return QueryResult(None, e, time.perf_counter() - t0)
+    finally:
+        setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, saved)
+
+
+def run_queries(queries: dict[str, Callable[[], Any]], timeout: float | dict | None = None) -> dict[str, QueryResult]:
+    """Run independent page queries at once; page latency is the slowest one, not the sum.
+
+    queries maps a name to a zero-argument callable. timeout is seconds for
+    every query or {name: seconds}. Each name gets a QueryResult; a failed or
+    timed-out query carries its error instead of raising.
+    """
+    if not queries:
+        return {}
+    if len(queries) == 1:
+        (name, fn), = queries.items()
+        return {name: _run_with_ctx(fn, get_script_run_ctx())}
+
+    pool = shared_pool()
+    ctx = get_script_run_ctx()
+    default = timeout if isinstance(timeout, (int, float)) else DEFAULT_TIMEOUT
+    limits = timeout if isinstance(timeout, dict) else {}
+
+    start = time.perf_counter()
+    futures = {name: pool.submit(_run_with_ctx, fn, ctx) for name, fn in queries.items()}
+    results = {}
+    # Wait in order of deadline so each query gets its own timeout.
+    for name in sorted(futures, key=lambda n: limits.get(n, default)):
+        remaining = start + limits.get(name, default) - time.perf_counter()
+        done, _ = wait([futures[name]], timeout=max(0.0, remaining))
+        if done:
+            results[name] = futures[name].result()
+        else:
+            futures[name].cancel()
+            results[name] = QueryResult(None, TimeoutError(f"{name} timed out"), time.perf_counter() - start)
+    return results
+
+
+def value_or(result: QueryResult, default=None):
+    return result.value if result.ok else default
@@ -0,0 +1,115 @@
+from __future__ import annotations
+import re
+from collections import defaultdict
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+FIELD_WEIGHTS = {"name": 1.0, "description": 0.4}
+EXACT, PREFIX, FUZZY = 1.0, 0.8, 0.6
+FUZZY_MIN_SIMILARITY = 0.35
+RESULT_MEMO_MAX = 512
+
+
+def _tokens(text) -> list[str]:
+    return _WORD.findall(str(text or "").lower())
+
+
+def _trigrams(token: str) -> set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CatalogIndex:
+    """In-memory product search: exact token, prefix and trigram (typo-tolerant) lookup.
+
+    Built once per catalog snapshot; search() never touches the database.
+    """
+
+    def __init__(self, products: list[dict]):
+        self.products = sorted(products, key=lambda p: str(p.get("name") or "").lower())
+        self._order = {p["id"]: i for i, p in enumerate(self.products)}
+        self._by_id = {p["id"]: p for p in self.products}
+        self._postings: dict[str, dict] = defaultdict(dict)  # token -> {product_id: field weight}
+        self._prefixes: dict[str, set] = defaultdict(set)  # prefix -> tokens
+        self._grams: dict[str, set] = defaultdict(set)  # trigram -> tokens
+        self._token_grams: dict[str, set] = {}
+        self._names = {p["id"]: str(p.get("name") or "").lower() for p in self.products}
+        self._memo: dict[tuple, list] = {}
+
+        for p in self.products:
+            for field, weight in FIELD_WEIGHTS.items():
+                for tok in _tokens(p.get(field)):
+                    post = self._postings[tok]
+                    post[p["id"]] = max(post.get(p["id"], 0.0), weight)
+
+        for tok in self._postings:
+            for i in range(1, len(tok) + 1):
+                self._prefixes[tok[:i]].add(tok)
+            grams = _trigrams(tok)
+            self._token_grams[tok] = grams
+            for g in grams:
+                self._grams[g].add(tok)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def _candidates(self, qtok: str) -> dict[str, float]:
+        """Index tokens that could be meant by one query token, with a match score."""
+        found: dict[str, float] = {}
+        if qtok in self._postings:
+            found[qtok] = EXACT
+        for tok in self._prefixes.get(qtok, ()):
+            found.setdefault(tok, PREFIX)
+
+        qgrams = _trigrams(qtok)
+        overlap: dict[str, int] = defaultdict(int)
+        for g in qgrams:
+            for tok in self._grams.get(g, ()):
+                overlap[tok] += 1
+        for tok, shared in overlap.items():
+            sim = shared / (len(qgrams) + len(self._token_grams[tok]) - shared)
+            if sim >= FUZZY_MIN_SIMILARITY:
+                found[tok] = max(found.get(tok, 0.0), FUZZY * sim)
+        return found
+
+    def search(self, query: str | None = None, category_id=None, limit: int | None = None) -> list[dict]:
+        """Products matching every word of query (ranked), optionally within one category."""
+        q = (query or "").strip().lower()
+        key = (q, category_id, limit)
+        hit = self._memo.get(key)
+        if hit is not None:
+            return hit
+
+        if not q:
+            results = [p for p in self.products if not category_id or p.get("category_id") == category_id]
+        else:
+            scores: dict | None = None
+            for qtok in _tokens(q):
+                tok_scores: dict = {}
+                for tok, s in self._candidates(qtok).items():
+                    for pid, weight in self._postings[tok].items():
+                        tok_scores[pid] = max(tok_scores.get(pid, 0.0), s * weight)
+                if scores is None:
+                    scores = tok_scores
+                else:
+                    scores = {pid: scores[pid] + s for pid, s in tok_scores.items() if pid in scores}
+                if not scores:
+                    break
+            scores = scores or {}
+            # Keep the old ilike '%q%' behaviour: a literal name match always ranks first.
+            for pid, name in self._names.items():
+                if q in name:
+                    scores[pid] = scores.get(pid, 0.0) + EXACT * 2
+
+            ranked = sorted(scores.items(), key=lambda kv: (-kv[1], self._order[kv[0]]))
+            results = [
+                self._by_id[pid] for pid, _s in ranked
+                if not category_id or self._by_id[pid].get("category_id") == category_id
+            ]
+
+        if limit is not None:
+            results = results[:limit]
+        if len(self._memo) >= RESULT_MEMO_MAX:
+            self._memo.clear()
+        self._memo[key] = results
+        return results
@@ -1,20 +1,114 @@
+import threading
+import time
 import streamlit as st
-from supabase_client import get_client
+from config import get_option
+from supabase_client import get_anon_client
+from warm_start import startup_snapshot
 
-def get_public_settings():
-    sb = get_client()
+FALLBACK_EMAIL = "wiveybakery@outlook.com"
+
+
+# Served when nothing fresh enough is held and the RPC fails (fail closed: maintenance off).
+FALLBACK_SETTINGS = {"maintenance": {"enabled": False}, "contact": {"email": FALLBACK_EMAIL}}
+
+
+class _SettingsSnapshot:
+    """Process-wide copy of get_public_settings(), served stale while it refreshes."""
+
+    def __init__(self):
+        self.data = None
+        self.ok_at = 0.0  # last successful fetch
+        self.fetched_at = 0.0  # last attempt, successful or not
+        self.refreshing = False
+        self.lock = threading.Lock()
+        self.fetch_lock = threading.Lock()  # one blocking fetch at a time
+
+    def invalidate(self):
+        with self.lock:
+            self.fetched_at = 0.0
+
+    def usable(self, now: float, ttl: float, max_stale: float) -> bool:
+        return self.data is not None and now - self.ok_at < ttl + max_stale
+
+
+@st.cache_resource(show_spinner=False)
+def _snapshot() -> _SettingsSnapshot:
+    snap = _SettingsSnapshot()
+    warm = startup_snapshot()
+    if warm and warm.get("settings") is not None:
+        # Served at once as already stale, so the first call refreshes it in the background.
+        snap.data = warm["settings"]
+        snap.ok_at = snap.fetched_at = time.monotonic() - get_option("PUBLIC_SETTINGS_TTL", 30.0)
+    return snap
+
+
+def _fetch_public_settings(sb):
     try:
         resp = sb.rpc("get_public_settings", {}).execute()
         return resp.data or {}
     except Exception:
-        # If RPC not created yet, fail closed (maintenance off, contact fallback)
-        return {"maintenance": {"enabled": False}, "contact": {"email": "wiveybakery@outlook.com"}}
+        return None
+
+
+def _refresh(snap: _SettingsSnapshot, sb):
+    data = _fetch_public_settings(sb)
+    with snap.lock:
+        now = time.monotonic()
+        if data is not None:
+            snap.data = data
+            snap.ok_at = now
+        # A failure still counts as an attempt (no retry until the TTL is up), but the
+        # data keeps its age, so it stops being served after PUBLIC_SETTINGS_MAX_STALE.
+        snap.fetched_at = now
+        snap.refreshing = False
+
+
+def get_public_settings():
+    snap = _snapshot()
+    ttl = get_option("PUBLIC_SETTINGS_TTL", 30.0)
+    max_stale = get_option("PUBLIC_SETTINGS_MAX_STALE", 600.0)
+
+    with snap.lock:
+        now = time.monotonic()
+        usable = snap.usable(now, ttl, max_stale)
+        data = snap.data
+        start_bg = usable and now - snap.fetched_at >= ttl and not snap.refreshing
+        if start_bg:
+            snap.refreshing = True
+    if usable:
+        if start_bg:
+            threading.Thread(target=_refresh, args=(snap, get_anon_client()), daemon=True).start()
+        return data
+
+    # Cold start or too stale to serve: one blocking fetch per process; the sessions
+    # that queued behind it use its result (or its failure) instead of fetching again.
+    with snap.fetch_lock:
+        with snap.lock:
+            now = time.monotonic()
+            if snap.usable(now, ttl, max_stale):
+                return snap.data
+            if now - snap.fetched_at < ttl:
+                return FALLBACK_SETTINGS  # just failed; retried after the TTL
+        _refresh(snap, get_anon_client())
+        with snap.lock:
+            return snap.data if snap.usable(time.monotonic(), ttl, max_stale) else FALLBACK_SETTINGS
+
+
+def cached_public_settings():
+    """Whatever settings this process holds right now, without fetching."""
+    return _snapshot().data
+
+
+def invalidate_public_settings():
+    _snapshot().invalidate()
+
 
 def maintenance_enabled() -> bool:
     s = get_public_settings()
     enabled = bool((s.get("maintenance") or {}).get("enabled", False))
     return enabled
 
+
 def contact_email() -> str:
     s = get_public_settings()
-    return str((s.get("contact") or {}).get("email", "wiveybakery@outlook.com"))
+    return str((s.get("contact") or {}).get("email", FALLBACK_EMAIL))
@@ -0,0 +1,86 @@
+-- Logged-in checkout: create the order and all of its items in ONE call / ONE transaction
+-- (replaces insert into orders + one insert into order_items per line from the app)
+create or replace function public.customer_create_order(
+  p_order jsonb,
+  p_items jsonb
+)
+returns table (
+  order_id bigint,
+  order_code text
+)
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+  v_order_id bigint;
+  v_order_code text;
+begin
+  insert into public.orders (
+    order_type,
+    payment_method,
+    status,
+    total_inc_vat,
+    order_notes,
+    customer_id,
+    customer_auth_user_id,
+    customer_email_snapshot,
+    customer_phone_snapshot,
+    created_at
+  )
+  values (
+    p_order->>'order_type',
+    p_order->>'payment_method',
+    'pending',
+    (p_order->>'total_inc_vat')::numeric,
+    p_order->>'order_notes',
+    (p_order->>'customer_id')::bigint,
+    auth.uid(),
+    p_order->>'customer_email_snapshot',
+    p_order->>'customer_phone_snapshot',
+    now()
+  )
+  returning id, orders.order_code
+  into v_order_id, v_order_code;
+
+  insert into public.order_items (
+    order_id,
+    product_id,
+    product_name_snapshot,
+    qty,
+    unit_price_ex_vat,
+    vat_rate,
+    line_total_ex_vat,
+    line_vat,
+    line_total_inc_vat,
+    unit_price_inc_vat
+  )
+  select
+    v_order_id,
+    i.product_id,
+    i.product_name_snapshot,
+    i.qty,
+    i.unit_price_ex_vat,
+    i.vat_rate,
+    i.line_total_ex_vat,
+    i.line_vat,
+    i.line_total_inc_vat,
+    i.unit_price_inc_vat
+  from jsonb_to_recordset(coalesce(p_items, '[]'::jsonb)) as i(
+    product_id bigint,
+    product_name_snapshot text,
+    qty int,
+    unit_price_ex_vat numeric,
+    vat_rate numeric,
+    line_total_ex_vat numeric,
+    line_vat numeric,
+    line_total_inc_vat numeric,
+    unit_price_inc_vat numeric
+  );
+
+  return query
+  select v_order_id as order_id, v_order_code as order_code;
+end;
+$$;
+
+grant execute on function public.customer_create_order(jsonb, jsonb) to authenticated;
@@ -0,0 +1,44 @@
+-- Live order tracking (ORDER_UPDATES_SOURCE=realtime): broadcast ONLY {order_code, status}
+-- on a per-order topic, "order-status:<order_code>". The app joins the topics of the
+-- codes customers are watching, so a listener has to know a code to hear about it.
+-- Anon keeps NO select on public.orders; tracking reads still go through track_order_by_code.
+create or replace function public.broadcast_order_status()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if new.status is distinct from old.status then
+    perform realtime.send(
+      jsonb_build_object('order_code', new.order_code, 'status', new.status),
+      'status',
+      'order-status:' || new.order_code,
+      false
+    );
+  end if;
+  return new;
+end;
+$$;
+
+revoke all on function public.broadcast_order_status() from public, anon, authenticated;
+
+drop trigger if exists orders_broadcast_status on public.orders;
+create trigger orders_broadcast_status
+after update of status on public.orders
+for each row
+execute function public.broadcast_order_status();
+
+-- Undo the earlier setup: full order rows must not be streamed to the anon key.
+do $$
+begin
+  if exists (
+    select 1 from pg_publication_tables
+    where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = 'orders'
+  ) then
+    alter publication supabase_realtime drop table public.orders;
+  end if;
+end;
+$$;
+
+revoke select on public.orders from anon;
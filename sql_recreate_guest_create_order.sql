@@ -19,7 +19,6 @@ as $$
 declare
   v_order_id bigint;
   v_order_code text;
-  v_item jsonb;
 begin
   insert into public.orders (
     order_type,
@@ -40,34 +39,41 @@ begin
   returning id, orders.order_code
   into v_order_id, v_order_code;
 
-  for v_item in
-    select * from jsonb_array_elements(coalesce(p_items, '[]'::jsonb))
-  loop
-    insert into public.order_items (
-      order_id,
-      product_id,
-      product_name_snapshot,
-      qty,
-      unit_price_ex_vat,
-      vat_rate,
-      line_total_ex_vat,
-      line_vat,
-      line_total_inc_vat,
-      unit_price_inc_vat
-    )
-    values (
-      v_order_id,
-      (v_item->>'product_id')::bigint,
-      v_item->>'product_name',
-      (v_item->>'qty')::int,
-      (v_item->>'unit_price_ex_vat')::numeric,
-      (v_item->>'vat_rate')::numeric,
-      (v_item->>'line_total_ex_vat')::numeric,
-      (v_item->>'line_vat')::numeric,
-      (v_item->>'line_total_inc_vat')::numeric,
-      (v_item->>'unit_price_inc_vat')::numeric
-    );
-  end loop;
+  -- All items in one set-based statement (was one INSERT per jsonb_array_elements row)
+  insert into public.order_items (
+    order_id,
+    product_id,
+    product_name_snapshot,
+    qty,
+    unit_price_ex_vat,
+    vat_rate,
+    line_total_ex_vat,
+    line_vat,
+    line_total_inc_vat,
+    unit_price_inc_vat
+  )
+  select
+    v_order_id,
+    i.product_id,
+    i.product_name,
+    i.qty,
+    i.unit_price_ex_vat,
+    i.vat_rate,
+    i.line_total_ex_vat,
+    i.line_vat,
+    i.line_total_inc_vat,
+    i.unit_price_inc_vat
+  from jsonb_to_recordset(coalesce(p_items, '[]'::jsonb)) as i(
+    product_id bigint,
+    product_name text,
+    qty int,
+    unit_price_ex_vat numeric,
+    vat_rate numeric,
+    line_total_ex_vat numeric,
+    line_vat numeric,
+    line_total_inc_vat numeric,
+    unit_price_inc_vat numeric
+  );
 
   return query
   select v_order_id as order_id, v_order_code as order_code;
@@ -1,8 +1,9 @@
 import streamlit as st
+from cart import Cart
 
 def init_state():
     if "cart" not in st.session_state:
-        st.session_state.cart = {}
+        st.session_state.cart = Cart()
     if "last_order" not in st.session_state:
         st.session_state.last_order = None
     if "sb_tokens" not in st.session_state:
@@ -1,7 +1,18 @@
 from __future__ import annotations
 import os
+import threading
+import time
+import httpx
 import streamlit as st
-from supabase import create_client, Client
+from gotrue import SyncMemoryStorage
+from gotrue.http_clients import SyncClient as AuthHttpClient
+from postgrest import SyncRequestBuilder, SyncRPCFilterRequestBuilder
+from postgrest.utils import SyncClient as RestHttpClient
+from supabase.lib.client_options import ClientOptions
+from supabase._sync.auth_client import SyncSupabaseAuthClient
+from config import get_option
+from telemetry import content_range_rows, record_call, rest_filters
+from token_manager import fresh_tokens
 
 
 def _get_cfg(key: str) -> str:
@@ -13,30 +24,196 @@ def _get_cfg(key: str) -> str:
     return v
 
 
-def _restore_session(sb: Client) -> None:
-    tokens = st.session_state.get("sb_tokens")
-    if not tokens:
-        return
+class _TracedAuthHttp(AuthHttpClient):
+    """gotrue's http client, recording each auth call."""
+
+    def request(self, method, url, **kwargs):
+        t0 = time.perf_counter()
+        path = httpx.URL(str(url)).path.split("/auth/v1", 1)[-1]
+        params = kwargs.get("params") or {}
+        filters = [f"{k}={v}" for k, v in params.items() if k in ("grant_type", "type")]
+        try:
+            resp = super().request(method, url, **kwargs)
+        except Exception as e:
+            record_call("auth", f"{method} {path}", t0, filters=filters, error=e)
+            raise
+        record_call("auth", f"{method} {path}", t0, filters=filters, size=len(resp.content), status=resp.status_code,
+                    error=resp.status_code if resp.status_code >= 400 else None)
+        return resp
+
+
+def _call_name(method: str, url) -> tuple[str, str]:
+    path = str(url).lstrip("/")
+    if path.startswith("rpc/"):
+        return "rpc", path[4:]
+    return "table", f"{method} {path}"
+
+
+class _Pool:
+    """One keep-alive HTTP transport per process, shared by every session."""
+
+    def __init__(self, url: str, anon: str):
+        self.url = url.rstrip("/")
+        self.anon = anon
+        self.transport = httpx.HTTPTransport(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=get_option("SUPABASE_POOL_SIZE", 20),
+                max_keepalive_connections=get_option("SUPABASE_POOL_KEEPALIVE", 10),
+                keepalive_expiry=get_option("SUPABASE_POOL_KEEPALIVE_EXPIRY", 30.0),
+            ),
+        )
+        timeout = httpx.Timeout(get_option("SUPABASE_TIMEOUT", 20.0), connect=get_option("SUPABASE_CONNECT_TIMEOUT", 5.0))
+        # Base headers carry the anon key only; the user token is added per request.
+        self.rest = RestHttpClient(
+            base_url=f"{self.url}/rest/v1",
+            headers={
+                "apikey": anon,
+                "Authorization": f"Bearer {anon}",
+                "Accept-Profile": "public",
+                "Content-Profile": "public",
+            },
+            timeout=timeout,
+            transport=self.transport,
+            follow_redirects=True,
+        )
+        self.auth_http = _TracedAuthHttp(timeout=timeout, transport=self.transport, follow_redirects=True)
+        self._lock = threading.Lock()
+        self.stats = {"clients_created": 0, "requests": 0, "errors": 0}
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+
+@st.cache_resource(show_spinner=False)
+def _get_pool(url: str, anon: str) -> _Pool:
+    return _Pool(url, anon)
+
+
+class _AuthedSession:
+    """Stands in for the httpx session used by postgrest request builders."""
+
+    def __init__(self, pool: _Pool, client: "PooledClient"):
+        self._pool = pool
+        self._client = client
+
+    def request(self, method, url, *, headers=None, **kwargs):
+        h = httpx.Headers(headers)
+        h["Authorization"] = f"Bearer {self._client.access_token or self._pool.anon}"
+        self._pool.count("requests")
+        kind, name = _call_name(method, url)
+        filters = rest_filters(kwargs.get("params"))
+        t0 = time.perf_counter()
+        try:
+            resp = self._pool.rest.request(method, url, headers=h, **kwargs)
+        except Exception as e:
+            self._pool.count("errors")
+            record_call(kind, name, t0, filters=filters, error=e)
+            raise
+        record_call(kind, name, t0, filters=filters, rows=content_range_rows(resp.headers), size=len(resp.content),
+                    wire_size=resp.num_bytes_downloaded, status=resp.status_code,
+                    error=resp.status_code if resp.status_code >= 400 else None)
+        return resp
+
+
+class PooledClient:
+    """Per-session client: own auth state, shared process-wide connections."""
+
+    def __init__(self, pool: _Pool):
+        self._pool = pool
+        self._session = _AuthedSession(pool, self)
+        self.access_token: str | None = None
+        self.applied_tokens: tuple | None = None
+        self.auth = SyncSupabaseAuthClient(
+            url=f"{pool.url}/auth/v1",
+            headers={**ClientOptions().headers, "apiKey": pool.anon, "Authorization": f"Bearer {pool.anon}"},
+            auto_refresh_token=False,
+            storage=SyncMemoryStorage(),
+            http_client=pool.auth_http,
+        )
+        self.auth.on_auth_state_change(self._on_auth_event)
+        pool.count("clients_created")
+
+    def _on_auth_event(self, event, session) -> None:
+        if event in ("SIGNED_IN", "TOKEN_REFRESHED"):
+            self.access_token = session.access_token if session else None
+        elif event == "SIGNED_OUT":
+            self.access_token = None
+
+    def table(self, table_name: str) -> SyncRequestBuilder:
+        return self.from_(table_name)
 
-    access = tokens.get("access_token")
-    refresh = tokens.get("refresh_token")
+    def from_(self, table_name: str) -> SyncRequestBuilder:
+        return SyncRequestBuilder(self._session, f"/{table_name}")
+
+    def rpc(self, fn: str, params: dict | None = None) -> SyncRPCFilterRequestBuilder:
+        return SyncRPCFilterRequestBuilder(
+            self._session, f"/rpc/{fn}", "POST", httpx.Headers(), httpx.QueryParams(), json=params or {}
+        )
+
+
+def _restore_session(sb: PooledClient) -> None:
+    tokens = st.session_state.get("sb_tokens")
+    access = (tokens or {}).get("access_token")
+    refresh = (tokens or {}).get("refresh_token")
     if not access or not refresh:
         return
 
-    try:
-        sb.auth.set_session(access_token=access, refresh_token=refresh)
-    except TypeError:
-        sb.auth.set_session(access, refresh)
-    except Exception:
+    # Refresh only near expiry (once per refresh token across concurrent reruns)
+    # and write the new pair back; otherwise nothing goes over the network.
+    fresh = fresh_tokens(sb.auth, tokens)
+    if fresh is None:
         st.session_state.sb_tokens = None
+        sb.access_token = None
+        return
+    if fresh is not tokens:
+        st.session_state.sb_tokens = fresh
+
+    sb.access_token = fresh["access_token"]
+    sb.applied_tokens = (fresh["access_token"], fresh["refresh_token"])
 
 
-def get_client() -> Client:
+def get_client() -> PooledClient:
     url = _get_cfg("SUPABASE_URL")
     anon = _get_cfg("SUPABASE_ANON_KEY")
+    pool = _get_pool(url, anon)
 
-    sb = create_client(url, anon)
+    sb = st.session_state.get("_sb_client")
+    tokens = st.session_state.get("sb_tokens")
+    # Logged out (or first run): start from a clean auth state.
+    if sb is None or sb._pool is not pool or (not tokens and sb.applied_tokens):
+        sb = PooledClient(pool)
+        st.session_state._sb_client = sb
 
     # ✅ Critical: restore tokens for EVERY page / rerun
     _restore_session(sb)
     return sb
+
+
+def _connection_stats(transport) -> dict:
+    # httpx exposes no pool introspection; httpcore's pool is read if it is there, else left out.
+    try:
+        conns = list(transport._pool.connections)
+        return {
+            "connections": len(conns),
+            "idle_connections": sum(1 for c in conns if c.is_idle()),
+            "active_connections": sum(1 for c in conns if not c.is_idle() and not c.is_closed()),
+        }
+    except Exception:
+        return {}
+
+
+def pool_stats() -> dict:
+    pool = _get_pool(_get_cfg("SUPABASE_URL"), _get_cfg("SUPABASE_ANON_KEY"))
+    return {**pool.stats, **_connection_stats(pool.transport)}
+
+
+@st.cache_resource(show_spinner=False)
+def _anon_client(url: str, anon: str) -> PooledClient:
+    return PooledClient(_get_pool(url, anon))
+
+
+def get_anon_client() -> PooledClient:
+    # Session-free client for public data; safe to use from background threads.
+    return _anon_client(_get_cfg("SUPABASE_URL"), _get_cfg("SUPABASE_ANON_KEY"))
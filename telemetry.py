@@ -0,0 +1,259 @@
+from __future__ import annotations
+import contextvars
+import functools
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+MAX_EVENTS = 20000  # recent calls kept for the debug panel / JSON export
+MAX_SAMPLES = 2000  # recent durations per call name, for percentiles
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_PREFIX = "bakery_backend"
+_NO_SESSION = "-"  # background threads (settings refresh, realtime feed)
+_view = contextvars.ContextVar("backend_view", default=None)
+
+
+class _Telemetry:
+    """Process-wide record of Supabase calls (table queries, RPCs, auth)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))  # (kind, name) -> seconds
+        self.totals = defaultdict(lambda: {"count": 0, "errors": 0, "seconds": 0.0, "rows": 0, "bytes": 0})
+        self.reruns = {}  # session_id -> current rerun number
+        self.fragments = {}  # session_id -> fragment name when its current rerun is a fragment rerun
+        self.views = defaultdict(lambda: {"calls": 0, "rows": 0, "bytes": 0, "wire_bytes": 0})
+
+    def begin_rerun(self, session_id: str, fragment: str | None = None) -> int:
+        with self.lock:
+            n = self.reruns[session_id] = self.reruns.get(session_id, 0) + 1
+            self.fragments[session_id] = fragment
+            if len(self.reruns) > 5000:
+                live = {e["session"] for e in self.events}
+                self.reruns = {s: r for s, r in self.reruns.items() if s in live or s == session_id}
+                self.fragments = {s: f for s, f in self.fragments.items() if s in self.reruns}
+            return n
+
+    def record(self, event: dict) -> None:
+        key = (event["kind"], event["name"])
+        with self.lock:
+            event["rerun"] = self.reruns.get(event["session"], 0)
+            event["fragment"] = self.fragments.get(event["session"])
+            self.events.append(event)
+            self.samples[key].append(event["seconds"])
+            t = self.totals[key]
+            t["count"] += 1
+            t["errors"] += bool(event["error"])
+            t["seconds"] += event["seconds"]
+            t["rows"] += event["rows"] or 0
+            t["bytes"] += event["bytes"] or 0
+            if event["view"]:
+                v = self.views[event["view"]]
+                v["calls"] += 1
+                v["rows"] += event["rows"] or 0
+                v["bytes"] += event["bytes"] or 0
+                v["wire_bytes"] += event["wire_bytes"] or 0
+
+
+@st.cache_resource(show_spinner=False)
+def _telemetry() -> _Telemetry:
+    return _Telemetry()
+
+
+def _session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else _NO_SESSION
+
+
+def begin_rerun(fragment: str | None = None) -> int:
+    """Start a new rerun for this session; calls recorded after this are grouped under it."""
+    return _telemetry().begin_rerun(_session_id(), fragment)
+
+
+def fragment(func=None, *, run_every=None):
+    """st.fragment whose own reruns (not the full ones it is part of) get a rerun number of their own."""
+    if func is None:
+        return lambda f: fragment(f, run_every=run_every)
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        ctx = get_script_run_ctx()
+        if ctx is not None and ctx.fragment_ids_this_run:
+            begin_rerun(func.__name__)
+        return func(*args, **kwargs)
+
+    return st.fragment(run, run_every=run_every)
+
+
+def current_rerun() -> int:
+    t = _telemetry()
+    with t.lock:
+        return t.reruns.get(_session_id(), 0)
+
+
+@contextmanager
+def call_view(name: str):
+    """Tag backend calls made inside the block with the view they serve (for bytes per view)."""
+    token = _view.set(name)
+    try:
+        yield
+    finally:
+        _view.reset(token)
+
+
+def rest_filters(params) -> list[str]:
+    """PostgREST query params as "column=operator" (values are left out: they can be personal data)."""
+    out = []
+    for k, v in (params.multi_items() if hasattr(params, "multi_items") else (params or {}).items()):
+        if k == "select":
+            continue
+        v = str(v)
+        out.append(f"{k}={v}" if k in ("order", "limit", "offset", "on_conflict") else f"{k}={v.split('.', 1)[0]}")
+    return out
+
+
+def content_range_rows(headers) -> int | None:
+    """Row count from PostgREST's Content-Range ("0-24/*" -> 25, "*/0" -> 0)."""
+    cr = headers.get("content-range") if headers is not None else None
+    if not cr:
+        return None
+    span = cr.split("/", 1)[0]
+    if span == "*":
+        return 0
+    try:
+        lo, hi = span.split("-", 1)
+        return int(hi) - int(lo) + 1
+    except ValueError:
+        return None
+
+
+def record_call(kind: str, name: str, started: float, *, filters=(), rows=None, size=None, wire_size=None, status=None,
+                error=None):
+    """Record one backend call; started is time.perf_counter() from before the call.
+
+    size is the decoded body; wire_size what came over the network (smaller when compressed).
+    """
+    _telemetry().record({
+        "ts": round(time.time(), 3),
+        "session": _session_id(),
+        "kind": kind,
+        "name": name,
+        "filters": list(filters),
+        "seconds": time.perf_counter() - started,
+        "rows": rows,
+        "bytes": size,
+        "wire_bytes": wire_size,
+        "view": _view.get(),
+        "status": status,
+        "error": type(error).__name__ if isinstance(error, BaseException) else error,
+    })
+
+
+def session_calls(session_id: str | None = None) -> list[dict]:
+    sid = session_id or _session_id()
+    t = _telemetry()
+    with t.lock:
+        return [dict(e) for e in t.events if e["session"] == sid]
+
+
+def rerun_summary(events: list[dict]) -> list[dict]:
+    """One row per rerun: call count, time spent waiting on the backend, rows and bytes."""
+    by_rerun = {}
+    for e in events:
+        r = by_rerun.setdefault(e["rerun"], {"rerun": e["rerun"], "fragment": e.get("fragment"), "calls": 0, "errors": 0,
+                                             "ms": 0.0, "rows": 0, "bytes": 0})
+        r["calls"] += 1
+        r["errors"] += bool(e["error"])
+        r["ms"] += e["seconds"] * 1000
+        r["rows"] += e["rows"] or 0
+        r["bytes"] += e["bytes"] or 0
+    for r in by_rerun.values():
+        r["ms"] = round(r["ms"], 1)
+    return sorted(by_rerun.values(), key=lambda r: r["rerun"], reverse=True)
+
+
+def _quantile(sorted_values, q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def aggregates() -> list[dict]:
+    """Process-wide totals and p50/p95/p99 per call name (percentiles over recent calls)."""
+    t = _telemetry()
+    with t.lock:
+        snapshot = [(k, dict(t.totals[k]), sorted(s)) for k, s in t.samples.items()]
+    out = []
+    for (kind, name), tot, v in sorted(snapshot):
+        row = {"kind": kind, "name": name, "count": tot["count"], "errors": tot["errors"]}
+        for q in QUANTILES:
+            row[f"p{int(q * 100)}_ms"] = round(_quantile(v, q) * 1000, 1) if v else None
+        row.update(rows=tot["rows"], bytes=tot["bytes"], seconds=round(tot["seconds"], 3))
+        out.append(row)
+    return out
+
+
+def view_bytes() -> list[dict]:
+    """Process-wide response bytes per view, decoded and on the wire."""
+    t = _telemetry()
+    with t.lock:
+        snapshot = {k: dict(v) for k, v in t.views.items()}
+    out = []
+    for name, v in sorted(snapshot.items()):
+        out.append({
+            "view": name,
+            **v,
+            "bytes_per_call": round(v["bytes"] / v["calls"]) if v["calls"] else 0,
+            "wire_ratio": round(v["wire_bytes"] / v["bytes"], 3) if v["bytes"] else None,
+        })
+    return out
+
+
+def export_jsonl(events: list[dict] | None = None) -> str:
+    """Calls as JSON lines (every recorded call in the process when events is None)."""
+    if events is None:
+        t = _telemetry()
+        with t.lock:
+            events = list(t.events)
+    return "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in events)
+
+
+def _label(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def export_prometheus() -> str:
+    """Prometheus text format: a latency summary plus row/byte/error counters per call."""
+    t = _telemetry()
+    with t.lock:
+        snapshot = [(k, dict(t.totals[k]), sorted(s)) for k, s in t.samples.items()]
+        views = {k: dict(v) for k, v in t.views.items()}
+    m = METRIC_PREFIX
+    lines = [
+        f"# HELP {m}_call_seconds Supabase call latency (quantiles over recent calls).",
+        f"# TYPE {m}_call_seconds summary",
+    ]
+    for (kind, name), tot, v in sorted(snapshot):
+        labels = f'kind="{_label(kind)}",call="{_label(name)}"'
+        for q in QUANTILES:
+            lines.append(f'{m}_call_seconds{{{labels},quantile="{q}"}} {_quantile(v, q) if v else 0:.6f}')
+        lines.append(f"{m}_call_seconds_sum{{{labels}}} {tot['seconds']:.6f}")
+        lines.append(f"{m}_call_seconds_count{{{labels}}} {tot['count']}")
+    for metric, key, help_text in (
+        ("call_errors_total", "errors", "Supabase calls that failed or returned an error status."),
+        ("rows_total", "rows", "Rows returned by Supabase calls."),
+        ("response_bytes_total", "bytes", "Response body bytes from Supabase calls."),
+    ):
+        lines.append(f"# HELP {m}_{metric} {help_text}")
+        lines.append(f"# TYPE {m}_{metric} counter")
+        for (kind, name), tot, _ in sorted(snapshot):
+            lines.append(f'{m}_{metric}{{kind="{_label(kind)}",call="{_label(name)}"}} {tot[key]}')
+    lines.append(f"# HELP {m}_view_bytes_total Response bytes per catalog view, decoded and on the wire.")
+    lines.append(f"# TYPE {m}_view_bytes_total counter")
+    for name, v in sorted(views.items()):
+        lines.append(f'{m}_view_bytes_total{{view="{_label(name)}",transfer="decoded"}} {v["bytes"]}')
+        lines.append(f'{m}_view_bytes_total{{view="{_label(name)}",transfer="wire"}} {v["wire_bytes"]}')
+    return "\n".join(lines) + "\n"
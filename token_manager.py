@@ -0,0 +1,95 @@
+from __future__ import annotations
+import threading
+import time
+import jwt
+import streamlit as st
+
+REFRESH_MARGIN_SECONDS = 60  # refresh this long before the access token expires
+RESULT_REUSE_SECONDS = 30  # late reruns holding the old refresh token reuse the new pair
+WAIT_SECONDS = 15
+
+
+def token_exp(access_token: str) -> int:
+    """The exp claim (unverified; only used to decide when to refresh)."""
+    try:
+        return int(jwt.decode(access_token, options={"verify_signature": False}).get("exp") or 0)
+    except jwt.PyJWTError:
+        return 0
+
+
+class _RefreshFlights:
+    """Single-flight refreshes keyed by refresh token, shared across reruns in the process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inflight = {}  # refresh_token -> threading.Event
+        self.results = {}  # refresh_token -> (finished_at, tokens or None)
+        self.stats = {"refreshes": 0, "joined": 0, "failures": 0}
+
+    def refresh(self, refresh_token: str, do_refresh):
+        now = time.monotonic()
+        with self.lock:
+            done = self.results.get(refresh_token)
+            if done and now - done[0] < RESULT_REUSE_SECONDS:
+                self.stats["joined"] += 1
+                return done[1]
+            ev = self.inflight.get(refresh_token)
+            leader = ev is None
+            if leader:
+                ev = self.inflight[refresh_token] = threading.Event()
+            else:
+                self.stats["joined"] += 1
+
+        if not leader:
+            ev.wait(WAIT_SECONDS)
+            with self.lock:
+                done = self.results.get(refresh_token)
+            return done[1] if done else None
+
+        try:
+            tokens = do_refresh(refresh_token)
+        except Exception:
+            tokens = None
+        with self.lock:
+            self.stats["refreshes"] += 1
+            if tokens is None:
+                self.stats["failures"] += 1
+            finished = time.monotonic()
+            self.results = {k: v for k, v in self.results.items() if finished - v[0] < RESULT_REUSE_SECONDS}
+            self.results[refresh_token] = (finished, tokens)
+            self.inflight.pop(refresh_token, None)
+        ev.set()
+        return tokens
+
+
+@st.cache_resource(show_spinner=False)
+def _flights() -> _RefreshFlights:
+    return _RefreshFlights()
+
+
+def fresh_tokens(auth, tokens: dict, margin: int = REFRESH_MARGIN_SECONDS) -> dict | None:
+    """tokens, or a refreshed pair when the access token is within margin of expiring.
+
+    Returns None when the session is gone (expired and the refresh failed).
+    A failed proactive refresh keeps the still-valid pair.
+    """
+    access, refresh = tokens.get("access_token"), tokens.get("refresh_token")
+    exp = token_exp(access)
+    now = time.time()
+    if exp - margin > now:
+        return tokens
+
+    def do_refresh(rt):
+        s = auth.refresh_session(rt).session
+        return {"access_token": s.access_token, "refresh_token": s.refresh_token} if s else None
+
+    new = _flights().refresh(refresh, do_refresh)
+    if new:
+        return new
+    return tokens if exp > now else None
+
+
+def refresh_stats() -> dict:
+    f = _flights()
+    with f.lock:
+        return dict(f.stats)
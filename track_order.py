@@ -1,5 +1,24 @@
+import time
 import streamlit as st
 from supabase_client import get_client
+from tracking_cache import cached_track, order_status, TrackingRateLimited
+from order_updates import get_hub, watch_order, unwatch_orders
+from telemetry import fragment
+
+LIVE_REFRESH_SECONDS = 3
+
+
+@fragment(run_every=LIVE_REFRESH_SECONDS)
+def _live_status(code: str):
+    # Reads the shared in-process feed only; no database call per refresh.
+    latest = watch_order(code)
+    if latest:
+        st.subheader(f"Live status: {latest[0]}")
+        st.caption(f"Updated {int(time.time() - latest[1])}s ago")
+    else:
+        st.caption("Waiting for a status update…")
+    if not get_hub().connected:
+        st.caption("Live feed reconnecting…")
 
 def page_track_order():
     st.header("🔎 Track your order")
@@ -7,10 +26,22 @@ def page_track_order():
     sb = get_client()
     code = st.text_input("Enter your order code", placeholder="WB-YYYYMMDD-001").strip()
 
+    live = st.toggle("Live updates", key="track_live", disabled=not code)
+    if live and code:
+        if watch_order(code) is None:
+            try:
+                status = order_status(cached_track(code, lambda: sb.rpc("track_order_by_code", {"p_order_code": code}).execute().data))
+                if status:
+                    get_hub().seed(code, status)
+            except Exception:
+                pass
+        _live_status(code)
+    else:
+        unwatch_orders()
+
     if st.button("Track order", disabled=not code):
         try:
-            resp = sb.rpc("track_order_by_code", {"p_order_code": code}).execute()
-            data = resp.data
+            data = cached_track(code, lambda: sb.rpc("track_order_by_code", {"p_order_code": code}).execute().data)
             if not data:
                 st.warning("No order found for that code.")
                 return
@@ -28,6 +59,8 @@ def page_track_order():
             for it in items:
                 st.write(f"- {it.get('qty')} × {it.get('product_name_snapshot')} (£{float(it.get('line_total_inc_vat',0) or 0):.2f})")
 
+        except TrackingRateLimited as e:
+            st.warning(f"You're checking very often. Please wait {int(e.retry_after) + 1} seconds and try again.")
         except Exception as e:
             st.error("Tracking failed.")
             st.exception(e)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import threading
+import time
+import streamlit as st
+from config import get_option
+
+# Seconds a tracking result is reused, by order status.
+STATUS_TTL = {
+    "pending": 15,
+    "preparing": 15,
+    "ready": 60,
+    "completed": 6 * 3600,
+    "cancelled": 6 * 3600,
+}
+DEFAULT_TTL = 15
+NOT_FOUND_TTL = 60  # unknown codes are negatively cached
+
+
+class TrackingRateLimited(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Too many tracking lookups; try again in {int(retry_after) + 1}s")
+        self.retry_after = retry_after
+
+
+class _TrackingCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # (namespace, code) -> (expires_at, data)
+        self.stats = {"hits": 0, "misses": 0, "not_found": 0, "rate_limited": 0}
+
+
+@st.cache_resource(show_spinner=False)
+def _cache() -> _TrackingCache:
+    return _TrackingCache()
+
+
+def order_status(data):
+    """Status from either RPC shape: {"order": {...}, "items": [...]} or the order row (or [row])."""
+    if isinstance(data, list):
+        data = data[0] if data else None
+    if not isinstance(data, dict):
+        return None
+    order = data.get("order") if isinstance(data.get("order"), dict) else data
+    return order.get("status")
+
+
+def _ttl(data) -> float:
+    if not data:
+        return NOT_FOUND_TTL
+    return STATUS_TTL.get(order_status(data), DEFAULT_TTL)
+
+
+def _take_token() -> None:
+    # Per-session token bucket; only lookups that reach the database spend a token.
+    rate = get_option("TRACKING_LOOKUPS_PER_MINUTE", 10)
+    now = time.monotonic()
+    tokens, last = st.session_state.get("_tracking_bucket", (float(rate), now))
+    tokens = min(float(rate), tokens + (now - last) * rate / 60.0)
+    if tokens < 1.0:
+        st.session_state._tracking_bucket = (tokens, now)
+        raise TrackingRateLimited((1.0 - tokens) * 60.0 / rate)
+    st.session_state._tracking_bucket = (tokens - 1.0, now)
+
+
+def cached_track(code: str, fetch, namespace: str = "rpc"):
+    """Tracking data for code, from cache when still fresh, else fetch() (the RPC call).
+
+    Raises TrackingRateLimited when this session has made too many database lookups.
+    """
+    key = (namespace, code.strip())
+    cache = _cache()
+    now = time.monotonic()
+    with cache.lock:
+        hit = cache.entries.get(key)
+    if hit and hit[0] > now:
+        with cache.lock:
+            cache.stats["hits"] += 1
+        return hit[1]
+
+    try:
+        _take_token()
+    except TrackingRateLimited:
+        with cache.lock:
+            cache.stats["rate_limited"] += 1
+        raise
+
+    data = fetch()
+    with cache.lock:
+        cache.stats["misses"] += 1
+        if not data:
+            cache.stats["not_found"] += 1
+        cache.entries[key] = (time.monotonic() + _ttl(data), data)
+        if len(cache.entries) > 10000:
+            cache.entries = {k: v for k, v in cache.entries.items() if v[0] > now}
+    return data
+
+
+def invalidate_tracking(code: str) -> None:
+    cache = _cache()
+    with cache.lock:
+        for k in [k for k in cache.entries if k[1] == code.strip()]:
+            cache.entries.pop(k, None)
+
+
+def tracking_cache_stats() -> dict:
+    cache = _cache()
+    with cache.lock:
+        return {**cache.stats, "entries": len(cache.entries)}
@@ -0,0 +1,107 @@
+from __future__ import annotations
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+import streamlit as st
+from config import get_option
+
+# File layout: header, then zlib-compressed JSON. Tables are stored as columns + row
+# lists so keys aren't repeated per row.
+#   magic 6s | format u16 | written_at f64 | payload crc32 u32 | payload
+MAGIC = b"WBSNAP"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct(">6sHdI")
+
+log = logging.getLogger(__name__)
+_write_lock = threading.Lock()
+
+
+def _path() -> str:
+    return get_option("CATALOG_SNAPSHOT_PATH", ".catalog_snapshot.bin")
+
+
+def _pack_rows(rows: list) -> dict:
+    columns = []
+    for r in rows:
+        for k in r:
+            if k not in columns:
+                columns.append(k)
+    return {"columns": columns, "rows": [[r.get(c) for c in columns] for r in rows]}
+
+
+def _unpack_rows(table: dict) -> list:
+    columns = table["columns"]
+    return [dict(zip(columns, row)) for row in table["rows"]]
+
+
+def encode_snapshot(categories: list, products: list, settings: dict | None, schema: str) -> bytes:
+    payload = zlib.compress(json.dumps({
+        "schema": schema,
+        "categories": _pack_rows(categories),
+        "products": _pack_rows(products),
+        "settings": settings,
+    }, separators=(",", ":"), default=str).encode("utf-8"), 6)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, time.time(), zlib.crc32(payload))
+    return header + payload
+
+
+def decode_snapshot(blob: bytes) -> dict | None:
+    """{"schema", "categories", "products", "settings", "written_at"}, or None if the blob is unusable.
+
+    schema is the writer's column list; readers only use the tables if it matches theirs.
+    """
+    if len(blob) < _HEADER.size:
+        return None
+    magic, fmt, written_at, payload_crc = _HEADER.unpack_from(blob)
+    payload = blob[_HEADER.size:]
+    if magic != MAGIC or fmt != FORMAT_VERSION:
+        return None
+    if zlib.crc32(payload) != payload_crc:
+        return None
+    data = json.loads(zlib.decompress(payload))
+    return {
+        "schema": data.get("schema"),
+        "categories": _unpack_rows(data["categories"]),
+        "products": _unpack_rows(data["products"]),
+        "settings": data.get("settings"),
+        "written_at": written_at,
+    }
+
+
+def write_snapshot(categories: list, products: list, settings: dict | None, schema: str) -> None:
+    """Atomically replace the snapshot file (best effort; a failed write only costs the next cold start)."""
+    path = _path()
+    try:
+        blob = encode_snapshot(categories, products, settings, schema)
+        with _write_lock:
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+    except (OSError, TypeError, ValueError):
+        log.warning("could not write catalog snapshot to %s", path, exc_info=True)
+
+
+def read_snapshot() -> dict | None:
+    max_age = get_option("CATALOG_SNAPSHOT_MAX_AGE", 7 * 24 * 3600.0)
+    try:
+        with open(_path(), "rb") as f:
+            snap = decode_snapshot(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, zlib.error, struct.error):
+        log.warning("ignoring unreadable catalog snapshot", exc_info=True)
+        return None
+    if snap is None or time.time() - snap["written_at"] > max_age:
+        return None
+    return snap
+
+
+@st.cache_resource(show_spinner=False)
+def startup_snapshot() -> dict | None:
+    """The snapshot this process started with (read once per process)."""
+    return read_snapshot()